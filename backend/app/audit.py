@@ -0,0 +1,184 @@
+"""Write-behind fronta pro audit log.
+
+Routy vkládají záznamy do paměťové fronty bez čekání na databázi a vlákno na
+pozadí je hromadně zapisuje každých AUDIT_FLUSH_INTERVAL_MS nebo po
+AUDIT_FLUSH_BATCH_SIZE záznamech. Akce z AUDIT_SYNC_ACTIONS (bezpečnostně
+kritické) se zapisují synchronně, stejně jako vše, dokud fronta neběží.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import insert
+
+from . import config, database  # noqa: F401 (config načte .env)
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_ENABLED = os.getenv("AUDIT_QUEUE_ENABLED", "true").lower() == "true"
+AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "500"))
+AUDIT_FLUSH_BATCH_SIZE = int(os.getenv("AUDIT_FLUSH_BATCH_SIZE", "200"))
+AUDIT_QUEUE_MAX_SIZE = int(os.getenv("AUDIT_QUEUE_MAX_SIZE", "10000"))
+# Po neúspěšném zápisu se čeká AUDIT_FLUSH_INTERVAL_MS, dvojnásobně s každým dalším, nejvýš tolik
+AUDIT_RETRY_MAX_MS = int(os.getenv("AUDIT_RETRY_MAX_MS", "30000"))
+# sync = při plné frontě zapsat synchronně, drop_oldest / drop_newest = zahodit záznam
+AUDIT_OVERFLOW_POLICY = os.getenv("AUDIT_OVERFLOW_POLICY", "sync")
+AUDIT_SYNC_ACTIONS = {
+    action.strip() for action in os.getenv("AUDIT_SYNC_ACTIONS", "LOGIN_FAILED").split(",") if action.strip()
+}
+
+OVERFLOW_POLICIES = ("sync", "drop_oldest", "drop_newest")
+
+
+def build_entry(user_id: Optional[int], action: str, resource_type: Optional[str] = None,
+                resource_id: Optional[str] = None, details: Optional[dict] = None) -> dict:
+    """Řádek audit_logs; čas se bere při vzniku události, ne při zápisu"""
+    return {
+        "user_id": user_id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": resource_id,
+        "details": json.dumps(details) if details else None,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+class AuditQueue:
+    def __init__(self, session_factory=None, max_size: int = AUDIT_QUEUE_MAX_SIZE,
+                 batch_size: int = AUDIT_FLUSH_BATCH_SIZE, flush_interval_ms: int = AUDIT_FLUSH_INTERVAL_MS,
+                 overflow_policy: str = AUDIT_OVERFLOW_POLICY, retry_max_ms: int = AUDIT_RETRY_MAX_MS):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy: {overflow_policy}")
+        self.session_factory = session_factory or database.SessionLocal
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.overflow_policy = overflow_policy
+        self.retry_max = retry_max_ms / 1000
+        self.dropped = 0
+        self.failures = 0  # neúspěšné zápisy za sebou
+        self._entries = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def enqueue(self, entry: dict) -> bool:
+        """Vloží záznam do fronty. Vrací False, pokud ho má volající zapsat sám (plná fronta, policy sync)."""
+        with self._condition:
+            if len(self._entries) >= self.max_size:
+                if self.overflow_policy == "sync":
+                    return False
+                self.dropped += 1
+                if self.overflow_policy == "drop_newest":
+                    return True
+                self._entries.popleft()
+            self._entries.append(entry)
+            if len(self._entries) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="audit-log-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10):
+        """Zastaví vlákno a zapíše vše, co zůstalo ve frontě"""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        written = 0
+        while True:
+            with self._condition:
+                batch = [self._entries.popleft() for _ in range(min(self.batch_size, len(self._entries)))]
+            if not batch:
+                return written
+            try:
+                write_entries(batch, self.session_factory)
+            except Exception:
+                self.failures += 1
+                # Traceback jen u prvního selhání, při výpadku databáze by zaplavil log
+                logger.error("Failed to write %d audit log entries (attempt %d), retrying in %.1fs",
+                             len(batch), self.failures, self.retry_delay(), exc_info=self.failures == 1)
+                self._requeue(batch)
+                return written
+            self.failures = 0
+            written += len(batch)
+
+    def _requeue(self, batch: list):
+        with self._condition:
+            room = self.max_size - len(self._entries)
+            if room < len(batch):
+                self.dropped += len(batch) - max(room, 0)
+                batch = batch[:max(room, 0)]
+            self._entries.extendleft(reversed(batch))
+
+    def retry_delay(self) -> float:
+        """Čekání před dalším pokusem po neúspěšném zápisu (exponenciální backoff)"""
+        if not self.failures:
+            return 0.0
+        base = self.flush_interval or 0.1
+        return min(self.retry_max, base * 2 ** min(self.failures - 1, 30))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                delay = self.retry_delay()
+                if delay:
+                    # Po chybě čekat celý backoff, plná fronta ho nezkracuje (jinak aktivní smyčka)
+                    deadline = time.monotonic() + delay
+                    while not self._stopping and time.monotonic() < deadline:
+                        self._condition.wait(deadline - time.monotonic())
+                elif not self._stopping and len(self._entries) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            if stopping:
+                return
+            self.flush()
+
+
+def write_entries(entries: list, session_factory=None):
+    """Zapíše záznamy jedním hromadným INSERTem ve vlastní transakci"""
+    db = (session_factory or database.SessionLocal)()
+    try:
+        db.execute(insert(database.AuditLog), entries)
+        db.commit()
+    finally:
+        db.close()
+
+
+queue = AuditQueue()
+
+
+def should_enqueue(action: str) -> bool:
+    return AUDIT_QUEUE_ENABLED and queue.running and action not in AUDIT_SYNC_ACTIONS
+
+
+def start():
+    if AUDIT_QUEUE_ENABLED:
+        queue.start()
+
+
+def stop():
+    queue.stop()
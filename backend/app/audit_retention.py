@@ -0,0 +1,164 @@
+"""Retence měsíčních partitions tabulky audit_logs (jen PostgreSQL).
+
+Spouští se periodicky (cron, systemd timer) z adresáře backend:
+
+    python -m app.audit_retention --retention-months 12 --archive-dir /var/backups/passowl/audit
+
+Založí partitions na AUDIT_PARTITIONS_AHEAD měsíců dopředu, aby nové záznamy
+nekončily v audit_logs_default. Partitions starší než retenční lhůta odpojí,
+vyexportuje do gzipovaného CSV a smaže. Odpojení se commituje samostatně, aby
+zámek na audit_logs nedržel export; při chybě exportu zůstane odpojená tabulka
+a další běh ji dokončí.
+"""
+import argparse
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from . import config, database  # noqa: F401 (config načte .env)
+
+logger = logging.getLogger(__name__)
+
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "12"))
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "audit_archive")
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3"))
+
+PARTITION_NAME = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def current_month() -> date:
+    # Hranice partitions jsou v UTC (create_audit_logs_partition)
+    today = datetime.now(timezone.utc).date()
+    return today.replace(day=1)
+
+
+def ensure_partitions(connection, months_ahead: int = AUDIT_PARTITIONS_AHEAD, month: Optional[date] = None) -> List[str]:
+    month = month or current_month()
+    return [
+        connection.execute(
+            text("SELECT create_audit_logs_partition(:month_start)"), {"month_start": add_months(month, offset)}
+        ).scalar()
+        for offset in range(months_ahead + 1)
+    ]
+
+
+def list_partitions(connection) -> List[tuple]:
+    """Měsíční partitions jako (název, první den měsíce), od nejstarší"""
+    rows = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = 'audit_logs'"
+    )).scalars()
+
+    partitions = []
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def expired_partitions(partitions: List[tuple], retention_months: int, month: Optional[date] = None) -> List[str]:
+    """Partitions, jejichž celý měsíc je starší než retenční lhůta"""
+    cutoff = add_months(month or current_month(), -retention_months)
+    return [name for name, partition_month in partitions if partition_month < cutoff]
+
+
+def list_detached_partitions(connection) -> List[str]:
+    """Odpojené, ale nesmazané partitions (přerušený export z dřívějšího běhu)"""
+    names = connection.execute(text(
+        "SELECT relname FROM pg_class "
+        "WHERE relkind = 'r' AND NOT relispartition AND relname LIKE 'audit_logs_%'"
+    )).scalars()
+    return sorted(name for name in names if PARTITION_NAME.match(name))
+
+
+def detach_partition(name: str):
+    """Odpojí partition v krátké vlastní transakci"""
+    # DETACH ... CONCURRENTLY nejde použít, audit_logs má DEFAULT partition
+    with database.engine.begin() as connection:
+        connection.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION "{name}"'))
+
+
+def archive_partition(name: str, archive_dir: str, detach: bool = True) -> str:
+    """Odpojí partition, zapíše ji do <archive_dir>/<name>.csv.gz a smaže ji"""
+    if not PARTITION_NAME.match(name):
+        raise ValueError(f"Not an audit_logs partition: {name}")
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    tmp_path = path + ".tmp"
+
+    # ACCESS EXCLUSIVE na audit_logs se drží jen po dobu odpojení, ne po dobu exportu
+    if detach:
+        detach_partition(name)
+
+    connection = database.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        with open(tmp_path, "wb") as raw_file:
+            with gzip.GzipFile(filename=f"{name}.csv", mode="wb", fileobj=raw_file) as archive:
+                cursor.copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', archive)
+            raw_file.flush()
+            os.fsync(raw_file.fileno())
+        os.replace(tmp_path, path)
+        cursor.execute(f'DROP TABLE "{name}"')
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        connection.close()
+
+    return path
+
+
+def run(retention_months: int = AUDIT_RETENTION_MONTHS, archive_dir: str = AUDIT_ARCHIVE_DIR,
+        months_ahead: int = AUDIT_PARTITIONS_AHEAD, dry_run: bool = False) -> List[str]:
+    with database.engine.begin() as connection:
+        if not dry_run:
+            created = ensure_partitions(connection, months_ahead)
+            logger.info("Ensured audit_logs partitions: %s", ", ".join(created))
+        expired = expired_partitions(list_partitions(connection), retention_months)
+        detached = list_detached_partitions(connection)
+
+    archived = []
+    for name, detach in [(name, False) for name in detached] + [(name, True) for name in expired]:
+        if dry_run:
+            logger.info("Would archive %s", name)
+            continue
+        path = archive_partition(name, archive_dir, detach=detach)
+        logger.info("Archived %s to %s", name, path)
+        archived.append(name)
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and drop expired audit_logs partitions")
+    parser.add_argument("--retention-months", type=int, default=AUDIT_RETENTION_MONTHS)
+    parser.add_argument("--archive-dir", default=AUDIT_ARCHIVE_DIR)
+    parser.add_argument("--months-ahead", type=int, default=AUDIT_PARTITIONS_AHEAD)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if database.engine.dialect.name != "postgresql":
+        parser.error("audit_logs partitioning requires PostgreSQL")
+    run(args.retention_months, args.archive_dir, args.months_ahead, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,94 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from . import crud, database, schemas
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import config, crud, crud_async, database, schemas  # noqa: F401 (config načte .env)
+from .cache import TTLCache
+from typing import List, Optional
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your_super_secret_jwt_key_here_change_in_production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Cache přihlášených uživatelů podle JWT `sub`, ušetří dotaz na users v každém požadavku
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+
+# Cache solí pro /auth/salts. Soli se po registraci nemění, TTL jen omezuje, jak
+# dlouho se po smazání uživatele vrací jeho soli. Negativní cache neexistujících
+# jmen má krátké TTL, protože registraci v jiném workeru tento proces nevidí.
+SALT_CACHE_TTL_SECONDS = float(os.getenv("SALT_CACHE_TTL_SECONDS", "86400"))
+SALT_CACHE_MAX_SIZE = int(os.getenv("SALT_CACHE_MAX_SIZE", "100000"))
+MISSING_USER_CACHE_TTL_SECONDS = float(os.getenv("MISSING_USER_CACHE_TTL_SECONDS", "10"))
+MISSING_USER_CACHE_MAX_SIZE = int(os.getenv("MISSING_USER_CACHE_MAX_SIZE", "100000"))
+
 security = HTTPBearer()
+user_cache = TTLCache(max_size=USER_CACHE_MAX_SIZE, ttl_seconds=USER_CACHE_TTL_SECONDS)
+salt_cache = TTLCache(max_size=SALT_CACHE_MAX_SIZE, ttl_seconds=SALT_CACHE_TTL_SECONDS)
+missing_user_cache = TTLCache(max_size=MISSING_USER_CACHE_MAX_SIZE, ttl_seconds=MISSING_USER_CACHE_TTL_SECONDS)
+
+# Výsledek lookup_cached_salts / load_user_salts pro jméno, které neexistuje
+USER_MISSING = object()
+
+
+def invalidate_user_cache(username: str):
+    user_cache.pop(username)
+
+
+def forget_missing_users(*usernames: str):
+    """Po založení uživatelů mimo ORM (hromadné INSERTy) zruší jejich negativní záznamy"""
+    for username in usernames:
+        missing_user_cache.pop(username)
+
+
+@event.listens_for(database.User, "after_update")
+@event.listens_for(database.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Změna nebo smazání uživatele přes ORM. Core UPDATE/DELETE (crud.set_user_keys)
+    # tyto eventy nevyvolá, volající pak cache čistí sám přes invalidate_user_cache.
+    invalidate_user_cache(target.username)
+    salt_cache.pop(target.username)
+
+
+@event.listens_for(database.User, "after_insert")
+def _forget_missing_user(mapper, connection, target):
+    forget_missing_users(target.username)
+
+
+def cache_user_salts(user) -> schemas.UserSalts:
+    salts = schemas.UserSalts(login_salt=user.login_salt, encryption_salt=user.encryption_salt)
+    salt_cache.set(user.username, salts)
+    return salts
+
+
+def lookup_cached_salts(username: str):
+    """UserSalts z cache, USER_MISSING pro známé neexistující jméno, jinak None (je třeba dotaz)"""
+    salts = salt_cache.get(username)
+    if salts is not None:
+        return salts
+    if username in missing_user_cache:
+        return USER_MISSING
+    return None
+
+
+def _cache_salts_row(username: str, row):
+    if row is None:
+        missing_user_cache.set(username, True)
+        return USER_MISSING
+    salts = schemas.UserSalts(login_salt=row.login_salt, encryption_salt=row.encryption_salt)
+    salt_cache.set(username, salts)
+    return salts
+
+
+def load_user_salts(db: Session, username: str):
+    return _cache_salts_row(username, crud.get_user_salts(db, username))
+
+
+async def load_user_salts_async(db: AsyncSession, username: str):
+    return _cache_salts_row(username, await crud_async.get_user_salts(db, username))
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -46,15 +121,32 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     return token_data
 
 
+def token_data_from_header(authorization: Optional[str]) -> Optional[schemas.TokenData]:
+    """Platný token z hlavičky Authorization mimo dependency systém (middleware), jinak None"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:].strip(), SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    username = payload.get("sub")
+    if username is None:
+        return None
+    return schemas.TokenData(username=username, roles=payload.get("roles", []))
+
+
 def get_current_user(token_data: schemas.TokenData = Depends(verify_token), 
-                    db: Session = Depends(database.get_db)):
-    user = crud.get_user_by_username(db, username=token_data.username)
+                    db: Session = Depends(database.get_db)) -> schemas.UserPrincipal:
+    user = user_cache.get(token_data.username)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        user = crud.get_user_principal(db, username=token_data.username)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user_cache.set(token_data.username, user)
     return user
 
 
@@ -67,6 +159,30 @@ def authenticate_user(db: Session, username: str, login_password_hash: str):
     return user
 
 
+async def get_current_user_async(token_data: schemas.TokenData = Depends(verify_token),
+                                 db: AsyncSession = Depends(database.get_async_db)) -> schemas.UserPrincipal:
+    user = user_cache.get(token_data.username)
+    if user is None:
+        user = await crud_async.get_user_principal(db, username=token_data.username)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        user_cache.set(token_data.username, user)
+    return user
+
+
+async def authenticate_user_async(db: AsyncSession, username: str, login_password_hash: str):
+    user = await crud_async.get_user_by_username(db, username)
+    if not user:
+        return False
+    if user.login_password_hash != login_password_hash:
+        return False
+    return user
+
+
 def require_roles(required_roles: List[str]):
     def role_checker(token_data: schemas.TokenData = Depends(verify_token)):
         user_roles = token_data.roles
@@ -0,0 +1,40 @@
+"""ETag / If-None-Match pro list endpointy trezoru.
+
+ETag se odvozuje z revize trezoru uživatele (crud.bump_vault_revision), cesty
+a query parametrů, takže různé stránky a filtry mají různé ETagy. Shoda
+znamená, že se od posledního dotazu nic nezměnilo a stačí odpovědět 304 bez
+čtení a serializace dat.
+"""
+import hashlib
+
+from fastapi import Request, Response, status
+
+
+def vault_etag(request: Request, user_id: int, revision: int) -> str:
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    digest = hashlib.sha256(f"{user_id}:{request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'W/"{revision}-{digest}"'
+
+
+def headers(etag: str) -> dict:
+    # Odpověď je per-user, klient ji musí vždy revalidovat
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Slabé porovnání, W/ prefix se ignoruje
+    return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers(etag))
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
@@ -0,0 +1,9 @@
+"""Jednorázové načtení .env do proměnných prostředí.
+
+Moduly aplikace čtou nastavení přes os.getenv při importu, proto tento modul
+importují jako první; load_dotenv (hledání souboru a parsování) tak proběhne
+jen jednou za proces.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
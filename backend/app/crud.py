@@ -1,8 +1,129 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from . import database, schemas
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, or_, func, insert, select, case, update, values, column, bindparam, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from . import audit, database, schemas
+from .cursor import encode_cursor, decode_cursor, parse_datetime
 from typing import List, Optional
-import json
+from datetime import datetime, timedelta
+import os
+
+
+# Pagination helpers
+class _sortable_datetime(FunctionElement):
+    """Datetime sloupec nebo hodnota cursoru v podobě, ve které se porovnává i řadí.
+
+    SQLite ukládá datetime jako text: server_default CURRENT_TIMESTAMP bez
+    zlomků sekundy, hodnoty z Pythonu s mikrosekundami. Textové porovnání obou
+    podob nesedí (shodný čas je "menší"), proto se na SQLite obě strany převádí
+    na jednotný tvar s milisekundami. Na PostgreSQL se nic nemění (index zůstává).
+    """
+    name = "sortable_datetime"
+    inherit_cache = True
+
+
+@compiles(_sortable_datetime)
+def _compile_sortable_datetime(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(_sortable_datetime, "sqlite")
+def _compile_sortable_datetime_sqlite(element, compiler, **kw):
+    return f"strftime('%Y-%m-%d %H:%M:%f', {compiler.process(element.clauses, **kw)})"
+
+
+def _sort_expression(sort_column):
+    if sort_column.type.python_type is datetime:
+        return _sortable_datetime(sort_column)
+    return sort_column
+
+
+def _keyset_clause(cursor: str, id_column, sort_key: Optional[str] = None, sort_column=None,
+                   descending: bool = False):
+    """Vrátí podmínku pro řádky za cursorem, neplatný cursor vyhodí ValueError"""
+    data = decode_cursor(cursor)
+    if data.get("sort") != sort_key or data.get("desc") != descending:
+        raise ValueError("Cursor does not match requested sorting")
+    if "id" not in data:
+        raise ValueError("Invalid cursor")
+    last_id = data["id"]
+
+    if sort_column is None:
+        return id_column < last_id if descending else id_column > last_id
+
+    last_value = data.get("value")
+    python_type = sort_column.type.python_type
+    sort_expression = sort_column
+    if python_type is datetime:
+        # Hodnota se převede stejně jako sloupec, jinak by se stránky na SQLite opakovaly
+        sort_expression = _sortable_datetime(sort_column)
+        last_value = _sortable_datetime(literal(parse_datetime(last_value), sort_column.type))
+    elif last_value is not None and (isinstance(last_value, bool) or not isinstance(last_value, python_type)):
+        raise ValueError("Invalid cursor")
+    if descending:
+        return or_(sort_expression < last_value, and_(sort_expression == last_value, id_column < last_id))
+    return or_(sort_expression > last_value, and_(sort_expression == last_value, id_column > last_id))
+
+
+def _keyset_order(id_column, sort_column=None, descending: bool = False):
+    # Vždy řadit i podle id, aby bylo pořadí stránek deterministické
+    order = []
+    if sort_column is not None:
+        sort_expression = _sort_expression(sort_column)
+        order.append(sort_expression.desc() if descending else sort_expression.asc())
+    order.append(id_column.desc() if descending else id_column.asc())
+    return order
+
+
+def _next_page(items: list, limit: int, id_column, sort_key: Optional[str] = None, sort_column=None,
+               descending: bool = False):
+    """Ořízne výsledek načtený s limit + 1 a vrátí (items, next_cursor)"""
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor({
+        "sort": sort_key,
+        "desc": descending,
+        "value": getattr(last, sort_column.key) if sort_column is not None else None,
+        "id": getattr(last, id_column.key)
+    })
+
+
+def _paginate(query, id_column, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+              include_total: bool = True, sort_key: Optional[str] = None, sort_column=None,
+              descending: bool = False):
+    """Stránkuje dotaz offsetem nebo keysetem podle (sort_column, id).
+
+    Vrací dict s items, total (None pokud include_total=False) a next_cursor,
+    který lze použít pro další stránku. Neplatný cursor vyhodí ValueError.
+    """
+    total = query.count() if include_total else None
+
+    if cursor:
+        query = query.filter(_keyset_clause(cursor, id_column, sort_key, sort_column, descending))
+    query = query.order_by(*_keyset_order(id_column, sort_column, descending))
+    if not cursor:
+        query = query.offset(skip)
+
+    # O jeden řádek navíc, abychom poznali, zda existuje další stránka
+    items, next_cursor = _next_page(
+        query.limit(limit + 1).all(), limit, id_column, sort_key, sort_column, descending
+    )
+    return {"items": items, "total": total, "next_cursor": next_cursor}
+
+
+def _credential_sort(sort_by: Optional[str], sort_direction: Optional[str]):
+    """Převede sort_by/sort_direction na (sort_key, sloupec, sestupně)"""
+    if sort_by == "created_at":
+        # Default to descending for date to maintain backward compatibility
+        return sort_by, database.Credential.updated_at, sort_direction != "asc"
+    if sort_by == "title":
+        # Default to ascending for name to maintain backward compatibility
+        return sort_by, database.Credential.title, sort_direction == "desc"
+    return None, None, False
+
 
 # User CRUD
 def get_user(db: Session, user_id: int):
@@ -13,6 +134,27 @@ def get_user_by_username(db: Session, username: str):
     return db.query(database.User).filter(database.User.username == username).first()
 
 
+def get_user_salts(db: Session, username: str):
+    """Jen login_salt a encryption_salt, bez načtení celého řádku uživatele"""
+    return db.query(database.User.login_salt, database.User.encryption_salt).filter(
+        database.User.username == username
+    ).first()
+
+
+def get_user_principal(db: Session, username: str):
+    """Načte jen id, jméno a role uživatele - bez klíčů a dalších velkých sloupců"""
+    rows = db.query(database.User.id, database.User.username, database.Role.name).outerjoin(
+        database.User.roles
+    ).filter(database.User.username == username).all()
+    if not rows:
+        return None
+    return schemas.UserPrincipal(
+        id=rows[0][0],
+        username=rows[0][1],
+        roles=[role_name for _, _, role_name in rows if role_name is not None]
+    )
+
+
 def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(database.User).offset(skip).limit(limit).all()
 
@@ -41,6 +183,73 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 
+# Počet uživatelů v jednom INSERTu při hromadném zakládání
+USER_BULK_CHUNK_SIZE = 500
+
+
+def create_users_bulk(db: Session, users: List[schemas.UserCreate], role_names: List[str], admin_user_id: int):
+    """Založí uživatele po dávkách INSERT ... ON CONFLICT (username) DO NOTHING v jedné transakci.
+
+    Role se dohledají jedním dotazem (chybějící roli "user" založí, jiné
+    neznámé role vyhodí ValueError). Vrací výsledky pro každou položku (index,
+    username, id nebo error) ve stejném pořadí jako vstup.
+    """
+    role_names = set(role_names)
+    roles = {role.name: role.id for role in db.query(database.Role).filter(database.Role.name.in_(role_names))}
+    if "user" in role_names and "user" not in roles:
+        user_role = database.Role(name="user")
+        db.add(user_role)
+        db.flush()
+        roles["user"] = user_role.id
+    unknown_roles = role_names - roles.keys()
+    if unknown_roles:
+        raise ValueError(f"Unknown roles: {', '.join(sorted(unknown_roles))}")
+
+    results = []
+    rows = []
+    seen_usernames = set()
+    for index, user in enumerate(users):
+        result = {"index": index, "username": user.username, "id": None, "error": None}
+        results.append(result)
+        if user.username in seen_usernames:
+            result["error"] = "Duplicate username"
+            continue
+        seen_usernames.add(user.username)
+        rows.append(user.model_dump())
+
+    user_ids = {}
+    table = database.User.__table__
+    upsert_insert = _UPSERT_INSERTS[db.get_bind().dialect.name]
+    for start in range(0, len(rows), USER_BULK_CHUNK_SIZE):
+        stmt = upsert_insert(table).values(rows[start:start + USER_BULK_CHUNK_SIZE]).on_conflict_do_nothing(
+            index_elements=[table.c.username]
+        ).returning(table.c.id, table.c.username)
+        # RETURNING vrací jen vložené řádky, existující jména se přeskočí
+        chunk_ids = {username: user_id for user_id, username in db.execute(stmt)}
+        user_ids.update(chunk_ids)
+        links = [{"user_id": user_id, "role_id": role_id} for user_id in chunk_ids.values() for role_id in roles.values()]
+        if links:
+            db.execute(insert(database.user_roles), links)
+
+    for result in results:
+        if result["error"] is None:
+            result["id"] = user_ids.get(result["username"])
+            if result["id"] is None:
+                result["error"] = "Username already registered"
+
+    create_audit_log(
+        db=db,
+        user_id=admin_user_id,
+        action="ADMIN_USERS_PROVISIONED",
+        resource_type="user",
+        details={"created": len(user_ids), "failed": len(users) - len(user_ids), "roles": sorted(role_names)},
+        commit=False
+    )
+    db.commit()
+
+    return {"created": len(user_ids), "results": results}
+
+
 def update_user_avatar(db: Session, user_id: int, avatar_url: str):
     db_user = db.query(database.User).filter(database.User.id == user_id).first()
     if db_user:
@@ -50,6 +259,20 @@ def update_user_avatar(db: Session, user_id: int, avatar_url: str):
     return db_user
 
 
+def get_user_stats(db: Session, user_id: int):
+    """Počty položek uživatele jedním dotazem (skalární poddotazy nad indexy user_id)"""
+    def count(column, condition):
+        return select(func.count(column)).where(condition).scalar_subquery()
+
+    row = db.query(
+        count(database.Credential.id, database.Credential.user_id == user_id).label("own_credentials_count"),
+        count(database.SharedCredential.id, database.SharedCredential.recipient_user_id == user_id).label("shared_credentials_count"),
+        count(database.SecureNote.id, database.SecureNote.user_id == user_id).label("secure_notes_count"),
+        count(database.PasswordCategory.id, database.PasswordCategory.user_id == user_id).label("categories_count")
+    ).one()
+    return schemas.UserStats.model_validate(row._mapping)
+
+
 # Role CRUD
 def get_role_by_name(db: Session, role_name: str):
     return db.query(database.Role).filter(database.Role.name == role_name).first()
@@ -64,42 +287,34 @@ def create_role(db: Session, role_name: str):
 
 
 # Credential CRUD
-def get_credentials(db: Session, user_id: int, skip: int = 0, limit: int = 100, sort_by: str = None, sort_direction: str = None, filter_category: Optional[int] = None):
-    query = db.query(database.Credential).filter(
+def _credential_query(db: Session):
+    # Kategorie (součást schemas.Credential) se načtou jedním dotazem pro všechna hesla místo lazy loadu pro každé
+    return db.query(database.Credential).options(selectinload(database.Credential.categories))
+
+
+def get_credentials(db: Session, user_id: int, skip: int = 0, limit: int = 100, sort_by: str = None, sort_direction: str = None, filter_category: Optional[int] = None,
+                    cursor: Optional[str] = None, include_total: bool = True):
+    query = _credential_query(db).filter(
         database.Credential.user_id == user_id
     )
 
-    # Filter by category if specified
+    # Filter by category if specified (EXISTS místo JOIN, který by mohl duplikovat řádky)
     if filter_category is not None:
-        query = query.join(database.Credential.categories).filter(
-            database.PasswordCategory.id == filter_category
+        query = query.filter(
+            database.Credential.categories.any(database.PasswordCategory.id == filter_category)
         )
 
     # Apply sorting if specified
-    if sort_by == "created_at":
-        if sort_direction == "asc":
-            query = query.order_by(database.Credential.updated_at.asc())
-        else:
-            # Default to descending for date to maintain backward compatibility
-            query = query.order_by(database.Credential.updated_at.desc())
-    elif sort_by == "title":
-        if sort_direction == "desc":
-            query = query.order_by(database.Credential.title.desc())
-        else:
-            # Default to ascending for name to maintain backward compatibility
-            query = query.order_by(database.Credential.title.asc())
-
-    # Get total count
-    total = query.count()
-
-    # Get paginated items
-    items = query.offset(skip).limit(limit).all()
+    sort_key, sort_column, descending = _credential_sort(sort_by, sort_direction)
 
-    return {"items": items, "total": total}
+    return _paginate(
+        query, database.Credential.id, skip=skip, limit=limit, cursor=cursor,
+        include_total=include_total, sort_key=sort_key, sort_column=sort_column, descending=descending
+    )
 
 
 def get_credential(db: Session, credential_id: int, user_id: int):
-    return db.query(database.Credential).filter(
+    return _credential_query(db).filter(
         and_(database.Credential.id == credential_id, database.Credential.user_id == user_id)
     ).first()
 
@@ -125,13 +340,84 @@ def create_credential(db: Session, credential: schemas.CredentialCreate, user_id
         db_credential.categories.extend(categories)
 
     db.add(db_credential)
+    bump_vault_revision(db, user_id)
     db.commit()
-    db.refresh(db_credential)
-    return db_credential
+    # Načíst znovu i s kategoriemi, commit je expiroval
+    return get_credential(db, db_credential.id, user_id)
+
+
+def create_credentials_batch(db: Session, credentials: List[schemas.CredentialCreate], user_id: int):
+    """Vloží dávku hesel jedním hromadným INSERTem a jedním commitem.
+
+    Vrací výsledky pro každou položku (index, id nebo error) ve stejném pořadí
+    jako vstup. Souhrnný záznam do audit logu je součástí stejné transakce.
+    """
+    # Kategorie ověř jedním dotazem pro celou dávku, cizí ID se tiše ignorují jako v create_credential
+    requested_category_ids = {category_id for credential in credentials for category_id in credential.category_ids}
+    allowed_category_ids = set()
+    if requested_category_ids:
+        allowed_category_ids = {
+            category_id for (category_id,) in db.query(database.PasswordCategory.id).filter(
+                and_(
+                    database.PasswordCategory.id.in_(requested_category_ids),
+                    database.PasswordCategory.user_id == user_id
+                )
+            )
+        }
+
+    iv_max_length = database.Credential.encryption_iv.type.length
+    results = []
+    rows = []
+    row_sources = []
+    for index, credential in enumerate(credentials):
+        if len(credential.encryption_iv) > iv_max_length:
+            results.append({"index": index, "id": None, "error": f"encryption_iv must be at most {iv_max_length} characters"})
+            continue
+        rows.append({
+            "user_id": user_id,
+            "title": credential.title,
+            "url": credential.url,
+            "username": credential.username,
+            "encrypted_data": credential.encrypted_data,
+            "encryption_iv": credential.encryption_iv
+        })
+        row_sources.append((index, credential))
+
+    if rows:
+        credential_ids = db.execute(
+            insert(database.Credential).returning(database.Credential.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+
+        links = []
+        for (index, credential), credential_id in zip(row_sources, credential_ids):
+            results.append({"index": index, "id": credential_id, "error": None})
+            links.extend(
+                {"credential_id": credential_id, "category_id": category_id}
+                for category_id in set(credential.category_ids) & allowed_category_ids
+            )
+        if links:
+            db.execute(insert(database.credential_category_links), links)
+
+    results.sort(key=lambda result: result["index"])
+    created = len(rows)
+
+    create_audit_log(
+        db=db,
+        user_id=user_id,
+        action="CREDENTIALS_IMPORTED",
+        resource_type="credential",
+        details={"created": created, "failed": len(credentials) - created},
+        commit=False
+    )
+    bump_vault_revision(db, user_id)
+    db.commit()
+
+    return {"created": created, "results": results}
 
 
 def update_credential(db: Session, credential_id: int, user_id: int, credential: schemas.CredentialUpdate):
-    db_credential = db.query(database.Credential).filter(
+    db_credential = _credential_query(db).filter(
         and_(database.Credential.id == credential_id, database.Credential.user_id == user_id)
     ).first()
 
@@ -157,9 +443,18 @@ def update_credential(db: Session, credential_id: int, user_id: int, credential:
             ).all()
             db_credential.categories.clear()
             db_credential.categories.extend(categories)
+            # Změna kategorií nemění sloupce hesla, ale delta sync ji musí vidět
+            db_credential.updated_at = func.now()
 
+        # Příjemci sdílení vidí název, URL a uživatelské jméno hesla
+        recipient_ids = [
+            recipient_user_id for (recipient_user_id,) in db.query(database.SharedCredential.recipient_user_id).filter(
+                database.SharedCredential.credential_id == credential_id
+            )
+        ]
+        bump_vault_revision(db, user_id, *recipient_ids)
         db.commit()
-        db.refresh(db_credential)
+        db_credential = get_credential(db, credential_id, user_id)
 
     return db_credential
 
@@ -171,31 +466,36 @@ def delete_credential(db: Session, credential_id: int, user_id: int):
 
     if db_credential:
         # First delete all shared instances of this credential
-        db.query(database.SharedCredential).filter(
+        shares_query = db.query(database.SharedCredential).filter(
             and_(database.SharedCredential.credential_id == credential_id,
                  database.SharedCredential.owner_user_id == user_id)
-        ).delete()
+        )
+        recipient_ids = []
+        for share_id, recipient_user_id in shares_query.with_entities(
+            database.SharedCredential.id, database.SharedCredential.recipient_user_id
+        ).all():
+            create_tombstone(db, recipient_user_id, "shared_credential", share_id)
+            recipient_ids.append(recipient_user_id)
+        shares_query.delete()
 
         # Then delete the credential itself
+        create_tombstone(db, user_id, "credential", credential_id)
         db.delete(db_credential)
+        bump_vault_revision(db, user_id, *recipient_ids)
         db.commit()
         return True
     return False
 
 
 # SecureNote CRUD
-def get_secure_notes(db: Session, user_id: int, skip: int = 0, limit: int = 100):
+def get_secure_notes(db: Session, user_id: int, skip: int = 0, limit: int = 100,
+                     cursor: Optional[str] = None, include_total: bool = True):
     query = db.query(database.SecureNote).filter(
         database.SecureNote.user_id == user_id
     )
 
-    # Get total count
-    total = query.count()
-
-    # Get paginated items
-    items = query.offset(skip).limit(limit).all()
-
-    return {"items": items, "total": total}
+    return _paginate(query, database.SecureNote.id, skip=skip, limit=limit, cursor=cursor,
+                     include_total=include_total)
 
 
 def get_secure_note(db: Session, note_id: int, user_id: int):
@@ -212,6 +512,7 @@ def create_secure_note(db: Session, note: schemas.SecureNoteCreate, user_id: int
         encryption_iv=note.encryption_iv
     )
     db.add(db_note)
+    bump_vault_revision(db, user_id)
     db.commit()
     db.refresh(db_note)
     return db_note
@@ -230,6 +531,7 @@ def update_secure_note(db: Session, note_id: int, user_id: int, note: schemas.Se
         if note.encryption_iv is not None:
             db_note.encryption_iv = note.encryption_iv
 
+        bump_vault_revision(db, user_id)
         db.commit()
         db.refresh(db_note)
 
@@ -242,7 +544,9 @@ def delete_secure_note(db: Session, note_id: int, user_id: int):
     ).first()
 
     if db_note:
+        create_tombstone(db, user_id, "secure_note", note_id)
         db.delete(db_note)
+        bump_vault_revision(db, user_id)
         db.commit()
         return True
     return False
@@ -268,6 +572,7 @@ def create_category(db: Session, category: schemas.PasswordCategoryCreate, user_
         color_hex=category.color_hex
     )
     db.add(db_category)
+    bump_vault_revision(db, user_id)
     db.commit()
     db.refresh(db_category)
     return db_category
@@ -284,6 +589,7 @@ def update_category(db: Session, category_id: int, user_id: int, category: schem
         if category.color_hex is not None:
             db_category.color_hex = category.color_hex
 
+        bump_vault_revision(db, user_id)
         db.commit()
         db.refresh(db_category)
 
@@ -296,7 +602,17 @@ def delete_category(db: Session, category_id: int, user_id: int):
     ).first()
 
     if db_category:
+        # Hesla v kategorii přijdou o vazbu, delta sync je musí poslat znovu
+        linked_ids = db.query(database.credential_category_links.c.credential_id).filter(
+            database.credential_category_links.c.category_id == category_id
+        )
+        db.query(database.Credential).filter(
+            database.Credential.id.in_(linked_ids.scalar_subquery())
+        ).update({database.Credential.updated_at: func.now()}, synchronize_session=False)
+
+        create_tombstone(db, user_id, "category", category_id)
         db.delete(db_category)
+        bump_vault_revision(db, user_id)
         db.commit()
         return True
     return False
@@ -304,47 +620,108 @@ def delete_category(db: Session, category_id: int, user_id: int):
 
 # AuditLog CRUD
 def create_audit_log(db: Session, user_id: Optional[int], action: str, resource_type: Optional[str] = None, 
-                    resource_id: Optional[str] = None, details: Optional[dict] = None):
-    details_json = json.dumps(details) if details else None
-
-    db_log = database.AuditLog(
-        user_id=user_id,
-        action=action,
-        resource_type=resource_type,
-        resource_id=resource_id,
-        details=details_json
-    )
+                    resource_id: Optional[str] = None, details: Optional[dict] = None, commit: bool = True):
+    """Zapíše audit záznam.
+
+    Běží-li write-behind fronta (audit.py), záznam se jen zařadí do fronty a
+    vrací se None. Synchronně se zapisují akce z AUDIT_SYNC_ACTIONS a záznamy
+    s commit=False, které zůstávají v transakci volajícího.
+    """
+    if commit and audit.should_enqueue(action):
+        if audit.queue.enqueue(audit.build_entry(user_id, action, resource_type, resource_id, details)):
+            return None
+
+    # created_at z build_entry jako u záznamů z fronty: server_default by na SQLite
+    # uložil čas v jiném textovém tvaru a keyset stránkování by se rozjelo
+    db_log = database.AuditLog(**audit.build_entry(user_id, action, resource_type, resource_id, details))
     db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
+    # commit=False nechá záznam v transakci volajícího
+    if commit:
+        db.commit()
+        db.refresh(db_log)
     return db_log
 
 
-def get_audit_logs(db: Session, skip: int = 0, limit: int = 100, user_id: Optional[int] = None):
-    query = db.query(database.AuditLog).outerjoin(
-        database.User, database.AuditLog.user_id == database.User.id
-    ).add_columns(database.User.username)
-    
+AUDIT_LOG_EXPORT_BATCH_SIZE = 1000
+
+
+def _audit_log_filters(user_id: Optional[int] = None, action: Optional[str] = None,
+                       resource_type: Optional[str] = None, resource_id: Optional[str] = None,
+                       created_from: Optional[datetime] = None, created_to: Optional[datetime] = None):
+    filters = []
     if user_id:
-        query = query.filter(database.AuditLog.user_id == user_id)
-    
-    results = query.order_by(database.AuditLog.created_at.desc()).offset(skip).limit(limit).all()
-    
-    audit_logs = []
-    for audit_log, username in results:
-        log_dict = {
-            "id": audit_log.id,
-            "user_id": audit_log.user_id,
-            "username": username,
-            "action": audit_log.action,
-            "resource_type": audit_log.resource_type,
-            "resource_id": audit_log.resource_id,
-            "details": audit_log.details,
-            "created_at": audit_log.created_at
-        }
-        audit_logs.append(schemas.AuditLog(**log_dict))
-    
-    return audit_logs
+        filters.append(database.AuditLog.user_id == user_id)
+    if action:
+        filters.append(database.AuditLog.action == action)
+    if resource_type:
+        filters.append(database.AuditLog.resource_type == resource_type)
+    if resource_id:
+        filters.append(database.AuditLog.resource_id == resource_id)
+    # Omezení na created_at umožní PostgreSQL vynechat nepotřebné měsíční partitions
+    if created_from is not None:
+        filters.append(database.AuditLog.created_at >= created_from)
+    if created_to is not None:
+        filters.append(database.AuditLog.created_at < created_to)
+    return filters
+
+
+def _audit_log_responses(db: Session, audit_logs: list):
+    """Převede záznamy na schémata, uživatelská jména dohledá jedním dotazem"""
+    user_ids = {audit_log.user_id for audit_log in audit_logs if audit_log.user_id is not None}
+    usernames = {}
+    if user_ids:
+        usernames = dict(
+            db.query(database.User.id, database.User.username).filter(database.User.id.in_(user_ids)).all()
+        )
+
+    return [
+        schemas.AuditLog(
+            id=audit_log.id,
+            user_id=audit_log.user_id,
+            username=usernames.get(audit_log.user_id),
+            action=audit_log.action,
+            resource_type=audit_log.resource_type,
+            resource_id=audit_log.resource_id,
+            details=audit_log.details,
+            created_at=audit_log.created_at
+        )
+        for audit_log in audit_logs
+    ]
+
+
+def get_audit_logs(db: Session, skip: int = 0, limit: int = 100, user_id: Optional[int] = None,
+                   action: Optional[str] = None, resource_type: Optional[str] = None,
+                   resource_id: Optional[str] = None, created_from: Optional[datetime] = None,
+                   created_to: Optional[datetime] = None, cursor: Optional[str] = None):
+    """Audit log od nejnovějších, stránkovaný offsetem nebo keysetem podle (created_at, id)"""
+    query = db.query(database.AuditLog).filter(*_audit_log_filters(
+        user_id, action, resource_type, resource_id, created_from, created_to
+    ))
+
+    result = _paginate(
+        query, database.AuditLog.id, skip=skip, limit=limit, cursor=cursor, include_total=False,
+        sort_key="created_at", sort_column=database.AuditLog.created_at, descending=True
+    )
+    result["items"] = _audit_log_responses(db, result["items"])
+    return result
+
+
+def iter_audit_logs(db: Session, user_id: Optional[int] = None, action: Optional[str] = None,
+                    resource_type: Optional[str] = None, resource_id: Optional[str] = None,
+                    created_from: Optional[datetime] = None, created_to: Optional[datetime] = None):
+    """Chronologicky prochází filtrovaný audit log po dávkách bez načtení všeho do paměti"""
+    query = db.query(database.AuditLog).filter(*_audit_log_filters(
+        user_id, action, resource_type, resource_id, created_from, created_to
+    )).order_by(*_keyset_order(database.AuditLog.id, database.AuditLog.created_at))
+
+    batch = []
+    for audit_log in query.yield_per(AUDIT_LOG_EXPORT_BATCH_SIZE):
+        batch.append(audit_log)
+        if len(batch) >= AUDIT_LOG_EXPORT_BATCH_SIZE:
+            yield from _audit_log_responses(db, batch)
+            batch = []
+    if batch:
+        yield from _audit_log_responses(db, batch)
 
 
 # Shared Credentials CRUD
@@ -358,8 +735,10 @@ def create_shared_credential(db: Session, shared_credential: schemas.SharedCrede
     if not credential:
         return None
 
-    # Ověř, že příjemce existuje
-    recipient = db.query(database.User).filter(database.User.id == shared_credential.recipient_user_id).first()
+    # Ověř, že příjemce existuje; FOR KEY SHARE čeká na dokončení rotace jeho klíčů
+    recipient = db.query(database.User.id).filter(
+        database.User.id == shared_credential.recipient_user_id
+    ).with_for_update(read=True, key_share=True).first()
     if not recipient:
         return None
 
@@ -383,33 +762,145 @@ def create_shared_credential(db: Session, shared_credential: schemas.SharedCrede
     )
 
     db.add(db_shared)
+    bump_vault_revision(db, owner_user_id, shared_credential.recipient_user_id)
     db.commit()
     db.refresh(db_shared)
     return db_shared
 
-def get_shared_credentials_received(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    query = db.query(database.SharedCredential).join(
-        database.Credential, database.SharedCredential.credential_id == database.Credential.id
-    ).join(
-        database.User, database.SharedCredential.owner_user_id == database.User.id
-    ).filter(
-        database.SharedCredential.recipient_user_id == user_id
-    )
+def create_shared_credentials_bulk(db: Session, credential_id: int,
+                                   recipients: List[schemas.SharedCredentialBulkRecipient], owner_user_id: int):
+    """Sdílí heslo s více příjemci jedním INSERTem (ON CONFLICT DO NOTHING) a jedním commitem.
+
+    Vrací None, pokud heslo nepatří vlastníkovi, jinak výsledky pro každého
+    příjemce ve stejném pořadí jako vstup (index, id sdílení nebo error).
+    """
+    owned = db.query(database.Credential.id).filter(
+        and_(database.Credential.id == credential_id, database.Credential.user_id == owner_user_id)
+    ).first()
+    if not owned:
+        return None
+
+    # Příjemce ověř jedním dotazem pro celou dávku; FOR KEY SHARE jako u jednotlivého
+    # sdílení, seřazeně, aby souběžné dávky zamykaly ve stejném pořadí
+    requested_user_ids = {recipient.recipient_user_id for recipient in recipients}
+    existing_user_ids = set()
+    if requested_user_ids:
+        existing_user_ids = set(db.scalars(
+            select(database.User.id).where(database.User.id.in_(requested_user_ids)).order_by(
+                database.User.id
+            ).with_for_update(read=True, key_share=True)
+        ))
+
+    iv_max_length = database.SharedCredential.sharing_iv.type.length
+    results = []
+    rows = []
+    seen_user_ids = set()
+    for index, recipient in enumerate(recipients):
+        result = {"index": index, "recipient_user_id": recipient.recipient_user_id, "id": None, "error": None}
+        results.append(result)
+        if recipient.recipient_user_id not in existing_user_ids:
+            result["error"] = "Recipient not found"
+        elif recipient.recipient_user_id in seen_user_ids:
+            result["error"] = "Duplicate recipient"
+        elif len(recipient.sharing_iv) > iv_max_length:
+            result["error"] = f"sharing_iv must be at most {iv_max_length} characters"
+        else:
+            seen_user_ids.add(recipient.recipient_user_id)
+            rows.append({
+                "credential_id": credential_id,
+                "owner_user_id": owner_user_id,
+                "recipient_user_id": recipient.recipient_user_id,
+                "encrypted_sharing_key": recipient.encrypted_sharing_key,
+                "encrypted_shared_data": recipient.encrypted_shared_data,
+                "sharing_iv": recipient.sharing_iv
+            })
+
+    shared_ids = {}
+    if rows:
+        table = database.SharedCredential.__table__
+        stmt = _UPSERT_INSERTS[db.get_bind().dialect.name](table).values(rows).on_conflict_do_nothing(
+            index_elements=[table.c.credential_id, table.c.recipient_user_id]
+        ).returning(table.c.id, table.c.recipient_user_id)
+        # RETURNING vrací jen skutečně vložené řádky, existující sdílení se přeskočí
+        shared_ids = {recipient_user_id: shared_id for shared_id, recipient_user_id in db.execute(stmt)}
+
+    for result in results:
+        if result["error"] is None:
+            result["id"] = shared_ids.get(result["recipient_user_id"])
+            if result["id"] is None:
+                result["error"] = "This credential is already shared with this user"
+
+    if shared_ids:
+        bump_vault_revision(db, owner_user_id, *shared_ids)
+        db.commit()
+
+    return {"credential_id": credential_id, "shared": len(shared_ids), "results": results}
 
-    # Get total count
-    total = query.count()
 
-    # Get paginated items
-    items = query.offset(skip).limit(limit).all()
+def shared_credential_columns():
+    """Sloupce pro SharedCredentialResponse, dotaz musí joinovat přes shared_credential_joins"""
+    return [
+        database.SharedCredential.id,
+        database.SharedCredential.credential_id,
+        database.SharedCredential.owner_user_id,
+        database.SharedCredential.recipient_user_id,
+        database.SharedCredential.encrypted_sharing_key,
+        database.SharedCredential.encrypted_shared_data,
+        database.SharedCredential.sharing_iv,
+        database.SharedCredential.created_at,
+        database.Credential.title.label("credential_title"),
+        database.Credential.url.label("credential_url"),
+        database.Credential.username.label("credential_username"),
+        database.User.username.label("owner_username")
+    ]
 
-    return {"items": items, "total": total}
+
+def shared_credential_joins(counterpart_user_id):
+    """Joiny k heslu a k uživateli, jehož jméno se vrací jako owner_username"""
+    return [
+        (database.Credential, database.SharedCredential.credential_id == database.Credential.id),
+        (database.User, counterpart_user_id == database.User.id)
+    ]
+
+
+def _shared_credential_query(db: Session, counterpart_user_id):
+    query = db.query(*shared_credential_columns())
+    for target, onclause in shared_credential_joins(counterpart_user_id):
+        query = query.join(target, onclause)
+    return query
+
+
+def _to_shared_credential_responses(rows):
+    return [schemas.SharedCredentialResponse.model_validate(row._mapping) for row in rows]
+
+
+def get_shared_credential_response(db: Session, shared_credential_id: int, counterpart_user_id=None):
+    """Jedním dotazem načte sdílení včetně údajů o hesle a jménu protistrany (výchozí je vlastník)"""
+    counterpart_user_id = counterpart_user_id if counterpart_user_id is not None else database.SharedCredential.owner_user_id
+    row = _shared_credential_query(db, counterpart_user_id).filter(
+        database.SharedCredential.id == shared_credential_id
+    ).first()
+    return _to_shared_credential_responses([row])[0] if row else None
+
+
+def get_shared_credentials_received(db: Session, user_id: int, skip: int = 0, limit: int = 100,
+                                    cursor: Optional[str] = None, include_total: bool = True):
+    """Sdílená hesla včetně údajů o hesle a vlastníkovi jedním dotazem na stránku"""
+    query = _shared_credential_query(db, database.SharedCredential.owner_user_id).filter(
+        database.SharedCredential.recipient_user_id == user_id
+    )
+
+    result = _paginate(query, database.SharedCredential.id, skip=skip, limit=limit, cursor=cursor,
+                       include_total=include_total)
+    result["items"] = _to_shared_credential_responses(result["items"])
+    return result
 
 def get_shared_credentials_owned(db: Session, user_id: int):
-    return db.query(database.SharedCredential).join(
-        database.Credential, database.SharedCredential.credential_id == database.Credential.id
-    ).filter(
+    """Sdílení vlastníka; owner_username nese jméno příjemce (tak to API vrací i dosud)"""
+    rows = _shared_credential_query(db, database.SharedCredential.recipient_user_id).filter(
         database.SharedCredential.owner_user_id == user_id
-    ).all()
+    ).order_by(database.SharedCredential.id).all()
+    return _to_shared_credential_responses(rows)
 
 def delete_shared_credential(db: Session, shared_credential_id: int, user_id: int):
     # User může smazat pouze své vlastní sdílení (jako owner)
@@ -419,7 +910,9 @@ def delete_shared_credential(db: Session, shared_credential_id: int, user_id: in
     ).first()
 
     if db_shared:
+        create_tombstone(db, db_shared.recipient_user_id, "shared_credential", db_shared.id)
         db.delete(db_shared)
+        bump_vault_revision(db, db_shared.owner_user_id, db_shared.recipient_user_id)
         db.commit()
         return True
     return False
@@ -430,13 +923,40 @@ def get_user_public_key(db: Session, user_id: int):
         return {"id": user.id, "username": user.username, "public_key": user.public_key}
     return None
 
+USER_SEARCH_MAX_LIMIT = 20
+# Kratší dotaz nemá žádný trigram, pg_trgm by prošel celý GIN index
+USER_SEARCH_MIN_SUBSTRING_LENGTH = 3
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 def search_users_by_username(db: Session, username_query: str, current_user_id: int, limit: int = 10):
-    return db.query(database.User).filter(
+    """Vyhledá uživatele podle části jména, seřazené shoda -> prefix -> podřetězec.
+
+    Na PostgreSQL ILIKE '%q%' využívá GIN trigramový index idx_users_username_trgm
+    (pg_trgm), na ostatních databázích jde o stejný dotaz bez indexu. Dotazy kratší
+    než USER_SEARCH_MIN_SUBSTRING_LENGTH hledají jen prefix, lower(username) LIKE 'q%'
+    obslouží B-tree index idx_users_username_lower_prefix (text_pattern_ops).
+    """
+    limit = max(1, min(limit, USER_SEARCH_MAX_LIMIT))
+    pattern = _escape_like(username_query)
+    if len(username_query) < USER_SEARCH_MIN_SUBSTRING_LENGTH:
+        match = func.lower(database.User.username).like(f"{_escape_like(username_query.lower())}%", escape="\\")
+    else:
+        match = database.User.username.ilike(f"%{pattern}%", escape="\\")
+    rank = case(
+        (func.lower(database.User.username) == username_query.lower(), 0),
+        (database.User.username.ilike(f"{pattern}%", escape="\\"), 1),
+        else_=2
+    )
+    return db.query(database.User.id, database.User.username).filter(
         and_(
-            database.User.username.ilike(f"%{username_query}%"),
+            match,
             database.User.id != current_user_id  # Nevracet současného uživatele
         )
-    ).limit(limit).all()
+    ).order_by(rank, func.length(database.User.username), database.User.username).limit(limit).all()
 
 # Currently not used in the codebase, but can be used for updating user keys in future
 def update_user_keys(db: Session, user_id: int, public_key: str, encrypted_private_key: str):
@@ -460,27 +980,23 @@ def get_shared_credential_users(db: Session, credential_id: int, owner_user_id:
     if not credential:
         return None
 
-    # Získej všechna sdílení pro toto heslo
-    shared_credentials = db.query(database.SharedCredential).filter(
+    # Získej všechna sdílení pro toto heslo i s příjemci jedním dotazem
+    rows = db.query(
+        database.User.id,
+        database.User.username,
+        database.SharedCredential.id.label("shared_credential_id"),
+        database.SharedCredential.encrypted_sharing_key,
+        database.SharedCredential.encrypted_shared_data,
+        database.SharedCredential.sharing_iv,
+        database.SharedCredential.created_at
+    ).join(
+        database.User, database.SharedCredential.recipient_user_id == database.User.id
+    ).filter(
         and_(database.SharedCredential.credential_id == credential_id,
              database.SharedCredential.owner_user_id == owner_user_id)
-    ).all()
+    ).order_by(database.SharedCredential.id).all()
 
-    result = []
-    for shared in shared_credentials:
-        user = db.query(database.User).filter(database.User.id == shared.recipient_user_id).first()
-        if user:
-            result.append({
-                "id": user.id,
-                "username": user.username,
-                "shared_credential_id": shared.id,
-                "encrypted_sharing_key": shared.encrypted_sharing_key,
-                "encrypted_shared_data": shared.encrypted_shared_data,
-                "sharing_iv": shared.sharing_iv,
-                "created_at": shared.created_at
-            })
-
-    return result
+    return [schemas.SharedUserResponse.model_validate(row._mapping) for row in rows]
 
 
 def delete_shared_credential_by_ids(db: Session, credential_id: int, recipient_user_id: int, owner_user_id: int):
@@ -502,7 +1018,9 @@ def delete_shared_credential_by_ids(db: Session, credential_id: int, recipient_u
     ).first()
 
     if db_shared:
+        create_tombstone(db, db_shared.recipient_user_id, "shared_credential", db_shared.id)
         db.delete(db_shared)
+        bump_vault_revision(db, db_shared.owner_user_id, db_shared.recipient_user_id)
         db.commit()
         return True
     return False
@@ -532,7 +1050,279 @@ def update_shared_credential(db: Session, credential_id: int, recipient_user_id:
         db_shared.encrypted_shared_data = shared_credential.encrypted_shared_data
         db_shared.sharing_iv = shared_credential.sharing_iv
 
+        bump_vault_revision(db, owner_user_id, recipient_user_id)
         db.commit()
         db.refresh(db_shared)
         return db_shared
     return None
+
+
+
+# VaultRevision (ETag pro list endpointy)
+# insert() s ON CONFLICT podle dialektu
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def bump_vault_revision(db: Session, *user_ids: int):
+    """Zvýší revizi trezoru uživatelů, commit provádí volající spolu se zápisem"""
+    # Seřazeně, aby souběžné transakce zamykaly řádky ve stejném pořadí
+    user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return
+    table = database.VaultRevision.__table__
+    stmt = _UPSERT_INSERTS[db.get_bind().dialect.name](table).values(
+        [{"user_id": user_id, "revision": 1} for user_id in user_ids]
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id], set_={"revision": table.c.revision + 1}
+    ))
+
+
+def get_vault_revision(db: Session, user_id: int) -> int:
+    revision = db.query(database.VaultRevision.revision).filter(
+        database.VaultRevision.user_id == user_id
+    ).scalar()
+    return revision or 0
+
+
+# DeletedItem (tombstones for delta sync)
+def create_tombstone(db: Session, user_id: int, resource_type: str, resource_id: int):
+    """Zaznamená smazání položky, commit provádí volající spolu se smazáním"""
+    db_item = database.DeletedItem(
+        user_id=user_id,
+        resource_type=resource_type,
+        resource_id=resource_id
+    )
+    db.add(db_item)
+    return db_item
+
+
+def purge_tombstones(db: Session, older_than: datetime) -> int:
+    """Smaže tombstones starší než `older_than` a zaznamená hranici pro /sync"""
+    db.add(database.TombstonePurge(purged_before=older_than))
+    deleted = db.query(database.DeletedItem).filter(
+        database.DeletedItem.deleted_at < older_than
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def is_sync_cursor_expired(db: Session, since: datetime) -> bool:
+    """Byly po `since` smazány tombstones? Pak delta nemusí obsahovat všechna smazání."""
+    return db.query(
+        select(database.TombstonePurge.id).where(database.TombstonePurge.purged_before > since).exists()
+    ).scalar()
+
+
+# Zápisy mají updated_at / deleted_at z času začátku své transakce. Transakce,
+# která začala před synchronizací a commitne až po ní, by s cursorem now()
+# spadla pod něj a klient by ji už nikdy nedostal. Cursor se proto posouvá
+# o překryv delší než nejdelší zapisující transakce (včetně rotace klíčů);
+# položky z překryvu přijdou znovu a klient je deduplikuje podle id.
+SYNC_CURSOR_OVERLAP_SECONDS = int(os.getenv("SYNC_CURSOR_OVERLAP_SECONDS", "300"))
+
+
+def get_vault_changes(db: Session, user_id: int, since: Optional[datetime] = None):
+    """Vrátí položky trezoru změněné po `since` a nový cursor.
+
+    Bez `since`, nebo když jsou tombstones z doby po `since` už smazané, vrací
+    celý trezor s full_resync=True a klient nahradí lokální stav.
+    """
+    # Čas databáze, ne aplikace, aby cursor odpovídal hodnotám v updated_at
+    synced_at = db.query(func.now()).scalar() - timedelta(seconds=SYNC_CURSOR_OVERLAP_SECONDS)
+    if since is not None and is_sync_cursor_expired(db, since):
+        since = None
+
+    credentials = db.query(database.Credential).options(
+        selectinload(database.Credential.categories)
+    ).filter(database.Credential.user_id == user_id)
+    notes = db.query(database.SecureNote).filter(database.SecureNote.user_id == user_id)
+    categories = db.query(database.PasswordCategory).filter(database.PasswordCategory.user_id == user_id)
+    shared = _shared_credential_query(db, database.SharedCredential.owner_user_id).filter(
+        database.SharedCredential.recipient_user_id == user_id
+    )
+    deleted = []
+
+    if since is not None:
+        credentials = credentials.filter(database.Credential.updated_at > since)
+        notes = notes.filter(database.SecureNote.updated_at > since)
+        categories = categories.filter(database.PasswordCategory.updated_at > since)
+        # Sdílení se mění i úpravou původního hesla (název, URL, uživatelské jméno)
+        shared = shared.filter(or_(
+            database.SharedCredential.updated_at > since,
+            database.Credential.updated_at > since
+        ))
+        deleted = db.query(database.DeletedItem).filter(
+            and_(database.DeletedItem.user_id == user_id,
+                 database.DeletedItem.deleted_at > since)
+        ).order_by(database.DeletedItem.deleted_at.asc()).all()
+
+    return {
+        "credentials": credentials.all(),
+        "secure_notes": notes.all(),
+        "categories": categories.all(),
+        "shared_credentials": _to_shared_credential_responses(shared.all()),
+        "deleted": deleted,
+        "full_resync": since is None,
+        "synced_at": synced_at
+    }
+
+
+# Vault export / import (NDJSON)
+VAULT_EXPORT_BATCH_SIZE = 500
+
+
+def _export_row(obj, table):
+    return {column.key: getattr(obj, column.key) for column in table.columns if column.key != "user_id"}
+
+
+def iter_vault_export(db: Session, user_id: int):
+    """Generuje záznamy celého trezoru uživatele po dávkách (server-side cursor přes yield_per).
+
+    Pořadí je categories, credentials, vazby na kategorie a notes, aby šel
+    export importovat čtením po řádcích.
+    """
+    categories = db.query(database.PasswordCategory).filter(
+        database.PasswordCategory.user_id == user_id
+    ).order_by(database.PasswordCategory.id).yield_per(VAULT_EXPORT_BATCH_SIZE)
+    for category in categories:
+        yield {"type": "category", **_export_row(category, database.PasswordCategory.__table__)}
+
+    credentials = db.query(database.Credential).filter(
+        database.Credential.user_id == user_id
+    ).order_by(database.Credential.id).yield_per(VAULT_EXPORT_BATCH_SIZE)
+    for credential in credentials:
+        yield {"type": "credential", **_export_row(credential, database.Credential.__table__)}
+
+    links = database.credential_category_links
+    link_rows = db.execute(
+        select(links.c.credential_id, links.c.category_id).join(
+            database.Credential, links.c.credential_id == database.Credential.id
+        ).where(database.Credential.user_id == user_id).execution_options(yield_per=VAULT_EXPORT_BATCH_SIZE)
+    )
+    for credential_id, category_id in link_rows:
+        yield {"type": "credential_category", "credential_id": credential_id, "category_id": category_id}
+
+    notes = db.query(database.SecureNote).filter(
+        database.SecureNote.user_id == user_id
+    ).order_by(database.SecureNote.id).yield_per(VAULT_EXPORT_BATCH_SIZE)
+    for note in notes:
+        yield {"type": "secure_note", **_export_row(note, database.SecureNote.__table__)}
+
+
+def import_categories(db: Session, user_id: int, categories: List[tuple]):
+    """Vloží kategorie (původní id, PasswordCategoryCreate), existující jména znovu použije.
+
+    Vrací mapování původních id na nová.
+    """
+    names = {category.name for _, category in categories}
+    existing = dict(db.query(database.PasswordCategory.name, database.PasswordCategory.id).filter(
+        and_(database.PasswordCategory.user_id == user_id,
+             database.PasswordCategory.name.in_(names))
+    ).all())
+
+    rows = {}
+    for _, category in categories:
+        if category.name not in existing and category.name not in rows:
+            rows[category.name] = {"user_id": user_id, "name": category.name, "color_hex": category.color_hex}
+    if rows:
+        inserted = db.execute(
+            insert(database.PasswordCategory).returning(database.PasswordCategory.name, database.PasswordCategory.id),
+            list(rows.values())
+        ).all()
+        existing.update(dict(inserted))
+
+    return {old_id: existing[category.name] for old_id, category in categories}
+
+
+def import_credentials(db: Session, user_id: int, credentials: List[tuple]):
+    """Hromadně vloží hesla (původní id, CredentialBase), vrací mapování id"""
+    new_ids = db.execute(
+        insert(database.Credential).returning(database.Credential.id, sort_by_parameter_order=True),
+        [{"user_id": user_id, **credential.model_dump()} for _, credential in credentials]
+    ).scalars().all()
+    return {old_id: new_id for (old_id, _), new_id in zip(credentials, new_ids)}
+
+
+def import_credential_category_links(db: Session, links: List[dict]):
+    if links:
+        db.execute(insert(database.credential_category_links), links)
+
+
+def import_secure_notes(db: Session, user_id: int, notes: List[schemas.SecureNoteCreate]):
+    if notes:
+        db.execute(insert(database.SecureNote), [{"user_id": user_id, **note.model_dump()} for note in notes])
+
+
+# Key rotation
+def get_key_rotation_targets(db: Session, user_id: int, lock: bool = False) -> dict:
+    """Id záznamů, které musí rotace klíčů pokrýt, a vlastníci přijatých sdílení.
+
+    S lock=True nejdřív zamkne řádek uživatele (SELECT ... FOR UPDATE) do konce
+    transakce. Nová sdílení uživateli (FOR KEY SHARE příjemce) i nová hesla a
+    poznámky (cizí klíč na users) pak čekají, až rotace skončí.
+    """
+    if lock:
+        db.execute(select(database.User.id).where(database.User.id == user_id).with_for_update())
+    return {
+        "credentials": set(db.scalars(select(database.Credential.id).where(database.Credential.user_id == user_id))),
+        "secure_notes": set(db.scalars(select(database.SecureNote.id).where(database.SecureNote.user_id == user_id))),
+        "shared_credentials": dict(db.execute(
+            select(database.SharedCredential.id, database.SharedCredential.owner_user_id).where(
+                database.SharedCredential.recipient_user_id == user_id
+            )
+        ).all())
+    }
+
+
+def _update_rows_by_id(db: Session, table, rows: List[dict], columns: tuple, *criteria):
+    """Přepíše sloupce řádků podle id.
+
+    Na PostgreSQL jedním UPDATE ... FROM (VALUES ...), jinde jako executemany.
+    updated_at nastaví onupdate sloupce, delta sync tak změny uvidí.
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        data = values(
+            *(column(name, table.c[name].type) for name in ("id", *columns)), name="rotated"
+        ).data([tuple(row[name] for name in ("id", *columns)) for row in rows])
+        db.execute(
+            update(table).where(table.c.id == data.c.id, *criteria).values({name: data.c[name] for name in columns})
+        )
+    else:
+        # Jména bindparam nesmí kolidovat se sloupci v SET
+        stmt = update(table).where(table.c.id == bindparam("row_id"), *criteria).values(
+            {name: bindparam(f"new_{name}") for name in columns}
+        )
+        db.execute(stmt, [{"row_id": row["id"], **{f"new_{name}": row[name] for name in columns}} for row in rows])
+
+
+def rotate_credentials(db: Session, user_id: int, credentials: List[schemas.KeyRotationCredential]):
+    table = database.Credential.__table__
+    _update_rows_by_id(db, table, [credential.model_dump() for credential in credentials],
+                       ("encrypted_data", "encryption_iv"), table.c.user_id == user_id)
+
+
+def rotate_secure_notes(db: Session, user_id: int, notes: List[schemas.KeyRotationSecureNote]):
+    table = database.SecureNote.__table__
+    _update_rows_by_id(db, table, [note.model_dump() for note in notes],
+                       ("encrypted_title", "encrypted_content", "encryption_iv"), table.c.user_id == user_id)
+
+
+def rotate_received_share_keys(db: Session, user_id: int, shared_keys: List[schemas.KeyRotationSharedKey]):
+    table = database.SharedCredential.__table__
+    _update_rows_by_id(db, table, [shared_key.model_dump() for shared_key in shared_keys],
+                       ("encrypted_sharing_key",), table.c.recipient_user_id == user_id)
+
+
+def set_user_keys(db: Session, user_id: int, keys: schemas.KeyRotationKeys):
+    """Nastaví nový pár klíčů bez commitu (commit provádí volající s celou rotací).
+
+    Core UPDATE obchází ORM eventy, volající po commitu volá auth.invalidate_user_cache.
+    """
+    db.execute(
+        update(database.User).where(database.User.id == user_id).values(
+            public_key=keys.public_key, encrypted_private_key=keys.encrypted_private_key
+        )
+    )
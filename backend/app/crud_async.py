@@ -0,0 +1,146 @@
+"""Async varianty crud funkcí pro nejvytíženější routy (ASYNC_DB_ENABLED=true).
+
+Async session neumí lazy loading, vztahy potřebné pro odpověď se proto
+načítají explicitně přes selectinload.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import and_, func, select
+from . import audit, database, schemas
+from .crud import (_keyset_clause, _keyset_order, _next_page, _credential_sort,
+                   shared_credential_columns, shared_credential_joins)
+from typing import Optional
+
+
+async def _paginate(db: AsyncSession, stmt, id_column, skip: int = 0, limit: int = 100,
+                    cursor: Optional[str] = None, include_total: bool = True, sort_key: Optional[str] = None,
+                    sort_column=None, descending: bool = False, scalars: bool = True):
+    """Async obdoba crud._paginate nad select() dotazem"""
+    total = None
+    if include_total:
+        total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+
+    if cursor:
+        stmt = stmt.where(_keyset_clause(cursor, id_column, sort_key, sort_column, descending))
+    stmt = stmt.order_by(*_keyset_order(id_column, sort_column, descending))
+    if not cursor:
+        stmt = stmt.offset(skip)
+
+    result = await db.execute(stmt.limit(limit + 1))
+    rows = result.scalars().all() if scalars else result.all()
+    items, next_cursor = _next_page(list(rows), limit, id_column, sort_key, sort_column, descending)
+    return {"items": items, "total": total, "next_cursor": next_cursor}
+
+
+# User
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(
+        select(database.User).options(selectinload(database.User.roles)).where(database.User.username == username)
+    )
+    return result.scalars().first()
+
+
+async def get_user_salts(db: AsyncSession, username: str):
+    """Async obdoba crud.get_user_salts"""
+    result = await db.execute(
+        select(database.User.login_salt, database.User.encryption_salt).where(database.User.username == username)
+    )
+    return result.first()
+
+
+async def get_user_principal(db: AsyncSession, username: str):
+    """Async obdoba crud.get_user_principal"""
+    result = await db.execute(
+        select(database.User.id, database.User.username, database.Role.name).outerjoin(
+            database.User.roles
+        ).where(database.User.username == username)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+    return schemas.UserPrincipal(
+        id=rows[0][0],
+        username=rows[0][1],
+        roles=[role_name for _, _, role_name in rows if role_name is not None]
+    )
+
+
+async def get_vault_revision(db: AsyncSession, user_id: int) -> int:
+    revision = await db.scalar(
+        select(database.VaultRevision.revision).where(database.VaultRevision.user_id == user_id)
+    )
+    return revision or 0
+
+
+# Credentials
+async def get_credentials(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, sort_by: str = None,
+                          sort_direction: str = None, filter_category: Optional[int] = None,
+                          cursor: Optional[str] = None, include_total: bool = True):
+    stmt = select(database.Credential).options(
+        selectinload(database.Credential.categories)
+    ).where(database.Credential.user_id == user_id)
+
+    if filter_category is not None:
+        stmt = stmt.where(database.Credential.categories.any(database.PasswordCategory.id == filter_category))
+
+    sort_key, sort_column, descending = _credential_sort(sort_by, sort_direction)
+    return await _paginate(
+        db, stmt, database.Credential.id, skip=skip, limit=limit, cursor=cursor,
+        include_total=include_total, sort_key=sort_key, sort_column=sort_column, descending=descending
+    )
+
+
+async def get_credential(db: AsyncSession, credential_id: int, user_id: int):
+    result = await db.execute(
+        select(database.Credential).options(selectinload(database.Credential.categories)).where(
+            and_(database.Credential.id == credential_id, database.Credential.user_id == user_id)
+        )
+    )
+    return result.scalars().first()
+
+
+# Secure notes
+async def get_secure_notes(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100,
+                           cursor: Optional[str] = None, include_total: bool = True):
+    stmt = select(database.SecureNote).where(database.SecureNote.user_id == user_id)
+    return await _paginate(db, stmt, database.SecureNote.id, skip=skip, limit=limit, cursor=cursor,
+                           include_total=include_total)
+
+
+async def get_secure_note(db: AsyncSession, note_id: int, user_id: int):
+    result = await db.execute(
+        select(database.SecureNote).where(
+            and_(database.SecureNote.id == note_id, database.SecureNote.user_id == user_id)
+        )
+    )
+    return result.scalars().first()
+
+
+# Shared credentials
+async def get_shared_credentials_received(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100,
+                                          cursor: Optional[str] = None, include_total: bool = True):
+    """Sdílená hesla včetně údajů o hesle a vlastníkovi jedním dotazem"""
+    counterpart_user_id = database.SharedCredential.owner_user_id
+    stmt = select(*shared_credential_columns())
+    for target, onclause in shared_credential_joins(counterpart_user_id):
+        stmt = stmt.join(target, onclause)
+    stmt = stmt.where(database.SharedCredential.recipient_user_id == user_id)
+
+    result = await _paginate(db, stmt, database.SharedCredential.id, skip=skip, limit=limit, cursor=cursor,
+                             include_total=include_total, scalars=False)
+    result["items"] = [schemas.SharedCredentialResponse.model_validate(row._mapping) for row in result["items"]]
+    return result
+
+
+# Audit log
+async def create_audit_log(db: AsyncSession, user_id: Optional[int], action: str, resource_type: Optional[str] = None,
+                           resource_id: Optional[str] = None, details: Optional[dict] = None):
+    # Zařazení do write-behind fronty neblokuje event loop (viz crud.create_audit_log)
+    if audit.should_enqueue(action):
+        if audit.queue.enqueue(audit.build_entry(user_id, action, resource_type, resource_id, details)):
+            return None
+
+    db_log = database.AuditLog(**audit.build_entry(user_id, action, resource_type, resource_id, details))
+    db.add(db_log)
+    await db.commit()
+    return db_log
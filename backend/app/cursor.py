@@ -0,0 +1,41 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+def encode_cursor(data: dict) -> str:
+    """Zakóduje stav stránkování / synchronizace do neprůhledného řetězce"""
+    raw = json.dumps(data, separators=(",", ":"), default=_json_default)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Dekóduje cursor z encode_cursor, při neplatném vstupu vyhodí ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor")
+    # Hodnoty jdou přímo do keyset podmínky, seznam nebo objekt by skončil chybou databáze
+    if "id" in data and (isinstance(data["id"], bool) or not isinstance(data["id"], int)):
+        raise ValueError("Invalid cursor")
+    if "value" in data and not isinstance(data["value"], (str, int, float, type(None))):
+        raise ValueError("Invalid cursor")
+    return data
+
+
+def parse_datetime(value) -> datetime:
+    """Převede ISO řetězec z cursoru zpět na datetime"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,19 +1,45 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, users, credentials, secure_notes, categories, admin, sharing
-from .database import engine, Base
+from fastapi.middleware.gzip import GZipMiddleware
+from .routers import auth, users, credentials, secure_notes, categories, admin, sharing, sync, vault
+from . import audit, config, database, metrics, profiler, ratelimit, read_your_writes  # noqa: F401 (config načte .env)
+from .auth import token_data_from_header
+from typing import Optional
+import hmac
 import os
-from dotenv import load_dotenv
+import threading
 
-load_dotenv()
+# Schéma vytváří `python -m app.manage init-db` (nebo db/db.sql), ne import aplikace.
+# DB_INIT_ON_STARTUP=true vrací původní chování pro lokální vývoj.
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "false").lower() == "true"
+# Počet spojení otevřených do poolu po startu workeru
+DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", "2"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_INIT_ON_STARTUP:
+        await run_in_threadpool(database.init_db)
+    audit.start()
+    if DB_POOL_PREWARM > 0:
+        # Na pozadí, aby databáze probouzející se ze scale-to-zero neblokovala start workeru
+        threading.Thread(
+            target=database.prewarm_pool, args=(DB_POOL_PREWARM,), name="db-pool-prewarm", daemon=True
+        ).start()
+    yield
+    # Zapíše zbývající audit záznamy (včetně souhrnu rate limitu) před ukončením workeru
+    ratelimit.flush_audit_summary(force=True)
+    audit.stop()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="PassOwl API",
     description="Backend pro aplikaci PassOwl",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -23,9 +49,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "X-Last-Write"],
 )
 
+# Gzip podle Accept-Encoding, jen pro odpovědi nad GZIP_MINIMUM_SIZE bajtů
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MINIMUM_SIZE", "1024")))
+
+# Prometheus metriky, middleware je vnější, aby měřil i CORS a kompresi
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Metriky prozrazují provoz po routách i odmítnutí rate limitu, /metrics proto
+# čte jen scraper s METRICS_TOKEN (Authorization: Bearer) nebo admin
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+if METRICS_ENABLED:
+    metrics.install()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Read-your-writes s replikami napříč workery: podepsaný čas zápisu v cookie a X-Last-Write
+if database.read_replicas is not None:
+    app.add_middleware(read_your_writes.ReadYourWritesMiddleware)
+
+# Profilování SQL dotazů: pro všechny požadavky přes QUERY_PROFILER_ENABLED,
+# jinak jen pro admina s hlavičkou X-Query-Profile (listenery bez profilu nic nedělají)
+profiler.install()
+app.add_middleware(profiler.QueryProfilerMiddleware)
+
 # Include routers
+# Async routy musí být registrované první, aby měly přednost před synchronními
+if database.ASYNC_DB_ENABLED:
+    from .routers import async_api
+    app.include_router(async_api.router)
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(credentials.router)
@@ -33,6 +86,8 @@ app.include_router(secure_notes.router)
 app.include_router(categories.router)
 app.include_router(admin.router)
 app.include_router(sharing.router)
+app.include_router(sync.router)
+app.include_router(vault.router)
 
 
 @app.get("/")
@@ -43,3 +98,27 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+def _check_metrics_access(authorization: Optional[str]):
+    if METRICS_TOKEN and authorization and hmac.compare_digest(
+        authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()
+    ):
+        return
+    token_data = token_data_from_header(authorization)
+    if token_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if "admin" not in token_data.roles:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+        # async kvůli čtení stavu threadpoolu z event loopu
+        _check_metrics_access(authorization)
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,74 @@
+"""Správa databázového schématu mimo start aplikace.
+
+Spouští se z adresáře backend před nasazením (import app.main schéma nevytváří):
+
+    python -m app.manage init-db     # chybějící tabulky podle modelů + výchozí role
+    python -m app.manage check-db    # ověří, že existují všechny tabulky modelů
+    python -m app.manage purge-tombstones --days 90   # smaže staré tombstones delta syncu
+
+Pro PostgreSQL je referenční schéma db/db.sql (partitioning audit_logs, trigger
+funkce). Ten ale tabulky nejdřív maže, proto ho init-db nespouští.
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import inspect
+
+from . import crud, database
+
+DEFAULT_ROLES = ("user", "admin")
+
+
+def missing_tables() -> list:
+    existing = set(inspect(database.engine).get_table_names())
+    return sorted(name for name in database.Base.metadata.tables if name not in existing)
+
+
+def init_db() -> dict:
+    created_tables = missing_tables()
+    database.init_db()
+
+    db = database.SessionLocal()
+    try:
+        existing_roles = {name for (name,) in db.query(database.Role.name)}
+        created_roles = [name for name in DEFAULT_ROLES if name not in existing_roles]
+        db.add_all(database.Role(name=name) for name in created_roles)
+        db.commit()
+    finally:
+        db.close()
+    return {"tables": created_tables, "roles": created_roles}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the PassOwl database schema")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("init-db", help="create missing tables and default roles")
+    subparsers.add_parser("check-db", help="exit with status 1 when model tables are missing")
+    purge_parser = subparsers.add_parser(
+        "purge-tombstones", help="delete sync tombstones older than --days (older sync cursors get a full resync)"
+    )
+    purge_parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    if args.command == "init-db":
+        created = init_db()
+        print(f"Created tables: {', '.join(created['tables']) or 'none'}")
+        print(f"Created roles: {', '.join(created['roles']) or 'none'}")
+    elif args.command == "check-db":
+        missing = missing_tables()
+        if missing:
+            print(f"Missing tables: {', '.join(missing)}")
+            sys.exit(1)
+        print("Schema OK")
+    elif args.command == "purge-tombstones":
+        db = database.SessionLocal()
+        try:
+            deleted = crud.purge_tombstones(db, datetime.now(timezone.utc) - timedelta(days=args.days))
+        finally:
+            db.close()
+        print(f"Deleted tombstones: {deleted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Metriky ve formátu Prometheus (text exposition format 0.0.4).
+
+Data sbírá čistý ASGI MetricsMiddleware (latence podle šablony routy a
+statusu, rozpracované požadavky, počet SQL dotazů na požadavek) a listener
+before_cursor_execute na engine. Stav poolu a threadpoolu se čte až při
+scrapu /metrics, na horké cestě je jen pár operací pod zámkem.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from . import database
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Počítadlo SQL dotazů aktuálního požadavku; list, aby ho šlo měnit i z threadpoolu
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        return super().render() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), function=None):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[tuple, float] = {}
+        # Volitelná funkce vracející aktuální hodnotu při scrapu (bez labelů)
+        self._function = function
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> list:
+        if self._function is not None:
+            value = self._function()
+            if value is None:
+                return []
+            return super().render() + [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            values = list(self._values.items())
+        return super().render() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [počty v jednotlivých bucketech (necumulativně) + +Inf, součet]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        lines = super().render()
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = (("le", _format_value(float(bound))),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "passowl_http_request_duration_seconds", "HTTP request latency by route template and status.",
+    ("method", "route", "status")
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "passowl_http_requests_in_flight", "HTTP requests currently being processed."
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    "passowl_db_queries_per_request", "SQL statements executed per HTTP request.",
+    ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+))
+POOL_CHECKOUT_WAIT = registry.register(Histogram(
+    "passowl_db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool.",
+    buckets=POOL_WAIT_BUCKETS
+))
+
+
+def _pool_stat(name: str):
+    def read():
+        stat = getattr(database.engine.pool, name, None)
+        return stat() if callable(stat) else None
+    return read
+
+
+registry.register(Gauge("passowl_db_pool_size", "Configured size of the connection pool.",
+                        function=_pool_stat("size")))
+registry.register(Gauge("passowl_db_pool_checked_out", "Connections currently checked out of the pool.",
+                        function=_pool_stat("checkedout")))
+registry.register(Gauge("passowl_db_pool_overflow", "Connections open beyond the pool size (negative while the pool fills).",
+                        function=_pool_stat("overflow")))
+registry.register(Gauge("passowl_db_pool_checked_in", "Idle connections in the pool.",
+                        function=_pool_stat("checkedin")))
+
+
+def _thread_limiter():
+    from anyio import to_thread
+    try:
+        return to_thread.current_default_thread_limiter()
+    except RuntimeError:
+        # Mimo event loop (např. při renderu z testu) limiter není k dispozici
+        return None
+
+
+def _threadpool_stat(name: str):
+    def read():
+        limiter = _thread_limiter()
+        return getattr(limiter, name) if limiter is not None else None
+    return read
+
+
+registry.register(Gauge("passowl_threadpool_busy_threads", "Worker threads running sync endpoints and dependencies.",
+                        function=_threadpool_stat("borrowed_tokens")))
+registry.register(Gauge("passowl_threadpool_max_threads", "Size of the AnyIO worker thread pool.",
+                        function=_threadpool_stat("total_tokens")))
+
+
+def render() -> str:
+    return registry.render()
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def install():
+    """Napojí počítání dotazů a měření čekání na pool na enginy z app.database"""
+    engines = [database.engine, *database.replica_engines]
+    if database.async_engine is not None:
+        engines.append(database.async_engine.sync_engine)
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _count_query):
+            event.listen(engine, "before_cursor_execute", _count_query)
+    database.pool_checkout_observer = POOL_CHECKOUT_WAIT.observe
+
+
+class MetricsMiddleware:
+    """Čistý ASGI middleware (bez BaseHTTPMiddleware, které by zpomalovalo streamované odpovědi)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        queries = [0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            _request_queries.reset(token)
+            # Šablona routy (/credentials/{credential_id}), ne konkrétní cesta - omezená kardinalita
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUEST_DURATION.observe(time.perf_counter() - started, method, route_path, str(status_code))
+            REQUEST_QUERIES.observe(queries[0], method, route_path)
@@ -0,0 +1,58 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Tuple
+
+from starlette.requests import Request
+
+MEDIA_TYPE = "application/x-ndjson"
+
+# Ochrana proti nekonečnému řádku bez \n
+MAX_LINE_BYTES = 10 * 1024 * 1024
+
+
+def dumps_line(record: dict) -> bytes:
+    """Serializuje jeden záznam jako řádek NDJSON"""
+    return (json.dumps(record, separators=(",", ":"), default=_json_default) + "\n").encode()
+
+
+async def iter_request_lines(request: Request) -> AsyncIterator[Tuple[int, dict]]:
+    """Čte tělo požadavku po řádcích a vrací (číslo řádku, objekt).
+
+    Prázdné řádky přeskakuje, neplatný JSON nebo příliš dlouhý řádek vyhodí ValueError.
+    """
+    buffer = b""
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f"Line {line_number + len(lines) + 1} is too long")
+        for line in lines:
+            line_number += 1
+            record = _parse_line(line, line_number)
+            if record is not None:
+                yield line_number, record
+
+    line_number += 1
+    record = _parse_line(buffer, line_number)
+    if record is not None:
+        yield line_number, record
+
+
+def _parse_line(line: bytes, line_number: int):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Line {line_number} is not valid JSON") from exc
+    if not isinstance(record, dict):
+        raise ValueError(f"Line {line_number} is not a JSON object")
+    return record
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
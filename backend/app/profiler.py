@@ -0,0 +1,207 @@
+"""Profilování SQL dotazů po požadavcích, vypnuté ve výchozím stavu.
+
+Zapíná se pro všechny požadavky přes QUERY_PROFILER_ENABLED=true, nebo pro
+jednotlivý požadavek admina hlavičkou X-Query-Profile: 1. Listenery
+before/after_cursor_execute zapisují příkazy a jejich trvání do profilu
+aktuálního požadavku. Souhrn jde do hlavičky Server-Timing a do klouzavého
+reportu v paměti (GET /admin/query-profile).
+
+Stejný tvar příkazu opakovaný QUERY_PROFILER_REPEAT_THRESHOLD× v jednom
+požadavku je typický N+1 problém a v reportu je označený.
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import event
+
+from . import auth, config, database  # noqa: F401 (config načte .env)
+
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "false").lower() == "true"
+QUERY_PROFILER_REPEAT_THRESHOLD = int(os.getenv("QUERY_PROFILER_REPEAT_THRESHOLD", "5"))
+QUERY_PROFILER_REPORT_SIZE = int(os.getenv("QUERY_PROFILER_REPORT_SIZE", "200"))
+
+PROFILE_HEADER = "x-query-profile"
+SLOWEST_STATEMENTS = 5
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("query_profile", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# Rozbalené IN seznamy a literály, aby stejný dotaz s jinými hodnotami měl stejný tvar
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _NUMBER.sub("N", shape)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.statements = []  # (statement, trvání v sekundách)
+        self._lock = threading.Lock()
+
+    def add(self, statement: str, duration: float):
+        with self._lock:
+            self.statements.append((statement, duration))
+
+    @property
+    def db_time(self) -> float:
+        return sum(duration for _, duration in self.statements)
+
+    def repeated(self, threshold: int = QUERY_PROFILER_REPEAT_THRESHOLD) -> list:
+        counts = Counter(statement_shape(statement) for statement, _ in self.statements)
+        return [
+            {"statement": shape, "count": count}
+            for shape, count in counts.most_common() if count >= threshold
+        ]
+
+    def summary(self) -> dict:
+        slowest = sorted(self.statements, key=lambda item: item[1], reverse=True)[:SLOWEST_STATEMENTS]
+        return {
+            "query_count": len(self.statements),
+            "db_time_ms": round(self.db_time * 1000, 3),
+            "slowest": [
+                {"statement": _WHITESPACE.sub(" ", statement).strip(), "duration_ms": round(duration * 1000, 3)}
+                for statement, duration in slowest
+            ],
+            "repeated": self.repeated()
+        }
+
+    def server_timing(self) -> str:
+        entries = [f'db;dur={self.db_time * 1000:.2f};desc="{len(self.statements)} queries"']
+        if self.statements:
+            entries.append(f"db-slowest;dur={max(duration for _, duration in self.statements) * 1000:.2f}")
+        repeated = self.repeated()
+        if repeated:
+            entries.append(f'db-repeated;desc="{repeated[0]["count"]}x same statement"')
+        return ", ".join(entries)
+
+
+class ProfileReport:
+    """Klouzavé okno posledních profilovaných požadavků"""
+
+    def __init__(self, size: int = QUERY_PROFILER_REPORT_SIZE):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            entries = list(self._entries)
+
+        routes = {}
+        for entry in entries:
+            key = f'{entry["method"]} {entry["route"]}'
+            route = routes.setdefault(key, {"requests": 0, "queries": 0, "max_queries": 0, "db_time_ms": 0.0,
+                                            "repeated_requests": 0})
+            route["requests"] += 1
+            route["queries"] += entry["query_count"]
+            route["max_queries"] = max(route["max_queries"], entry["query_count"])
+            route["db_time_ms"] += entry["db_time_ms"]
+            route["repeated_requests"] += 1 if entry["repeated"] else 0
+
+        return {
+            "routes": {
+                key: {
+                    "requests": route["requests"],
+                    "avg_queries": round(route["queries"] / route["requests"], 2),
+                    "max_queries": route["max_queries"],
+                    "avg_db_time_ms": round(route["db_time_ms"] / route["requests"], 3),
+                    "repeated_requests": route["repeated_requests"]
+                }
+                for key, route in sorted(routes.items(), key=lambda item: -item[1]["max_queries"])
+            },
+            "recent": list(reversed(entries))
+        }
+
+
+report = ProfileReport()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("query_profiler_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is None:
+        return
+    starts = conn.info.get("query_profiler_start")
+    if starts:
+        profile.add(statement, time.perf_counter() - starts.pop())
+
+
+def install():
+    engines = [database.engine, *database.replica_engines]
+    if database.async_engine is not None:
+        engines.append(database.async_engine.sync_engine)
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _requested_by_admin(scope) -> bool:
+    headers = dict(scope["headers"])
+    if headers.get(PROFILE_HEADER.encode()) not in (b"1", b"true"):
+        return False
+    authorization = headers.get(b"authorization")
+    token_data = auth.token_data_from_header(authorization.decode("latin-1") if authorization else None)
+    return token_data is not None and "admin" in token_data.roles
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (QUERY_PROFILER_ENABLED or _requested_by_admin(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # U běžných odpovědí je v tuto chvíli handler hotový, u streamů jde o dosavadní dotazy
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", profile.server_timing().encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            route = scope.get("route")
+            report.add({
+                "method": scope["method"],
+                "route": getattr(route, "path", None) or "unmatched",
+                "path": scope["path"],
+                "status": status_code,
+                "at": datetime.now(timezone.utc).isoformat(),
+                **profile.summary()
+            })
@@ -0,0 +1,200 @@
+"""Token-bucket rate limiting pro neautentizované auth endpointy.
+
+Limity se počítají zvlášť pro IP adresu klienta a pro uživatelské jméno
+(credential stuffing z mnoha IP na jeden účet). Kontrola běží jako závislost
+routy před database.get_db, odmítnutý požadavek tak nesáhne na databázi.
+
+Stav bucketů drží ve výchozím stavu kompaktní LRU struktura v procesu.
+Sdílený backend (např. Redis pro více workerů) se zapojí přes
+RATE_LIMIT_BACKEND=modul:factory; factory vrací objekt s metodou
+take(key, rate, burst) -> sekundy do dalšího tokenu (0 = povoleno).
+
+Odmítnuté požadavky nepíší audit záznam jednotlivě, ale sčítají se do
+souhrnu RATE_LIMITED zapsaného jednou za RATE_LIMIT_AUDIT_INTERVAL_SECONDS.
+"""
+import importlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+from . import audit, config, metrics  # noqa: F401 (config načte .env)
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "60"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "30"))
+RATE_LIMIT_USERNAME_PER_MINUTE = float(os.getenv("RATE_LIMIT_USERNAME_PER_MINUTE", "20"))
+RATE_LIMIT_USERNAME_BURST = float(os.getenv("RATE_LIMIT_USERNAME_BURST", "10"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "")
+RATE_LIMIT_AUDIT_INTERVAL_SECONDS = float(os.getenv("RATE_LIMIT_AUDIT_INTERVAL_SECONDS", "60"))
+
+# Delší klíče se zkracují, aby útočník nemohl plnit paměť dlouhými jmény
+MAX_KEY_LENGTH = 256
+SUMMARY_TOP_KEYS = 20
+
+RATE_LIMITED = metrics.registry.register(metrics.Counter(
+    "passowl_rate_limited_requests_total", "Requests rejected by the auth rate limiter.",
+    ("endpoint", "scope")
+))
+
+
+class MemoryBackend:
+    """Buckety v OrderedDict (klíč -> (tokeny, čas poslední aktualizace)) s LRU limitem počtu klíčů"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            # Vyhozený klíč začne znovu s plným bucketem
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+def _load_backend():
+    if not RATE_LIMIT_BACKEND:
+        return MemoryBackend()
+    module_name, _, factory_name = RATE_LIMIT_BACKEND.partition(":")
+    factory = getattr(importlib.import_module(module_name), factory_name or "create_backend")
+    return factory()
+
+
+backend = _load_backend()
+
+
+class _RejectionSummary:
+    """Sčítá odmítnuté požadavky a jednou za interval je zapíše jako jeden audit záznam"""
+
+    def __init__(self, interval: float = RATE_LIMIT_AUDIT_INTERVAL_SECONDS):
+        self.interval = interval
+        self._counts = Counter()
+        self._window_started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, scope: str, key: str):
+        with self._lock:
+            self._counts[(endpoint, scope, key)] += 1
+
+    def due(self) -> bool:
+        return bool(self._counts) and time.monotonic() - self._window_started >= self.interval
+
+    def take_due(self, force: bool = False):
+        """Vrátí souhrn k zápisu, pokud uplynul interval (nebo force), jinak None"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._counts or (not force and now - self._window_started < self.interval):
+                return None
+            counts, self._counts = self._counts, Counter()
+            window = now - self._window_started
+            self._window_started = now
+
+        by_endpoint = Counter()
+        for (endpoint, scope, _), count in counts.items():
+            by_endpoint[f"{endpoint} {scope}"] += count
+        return {
+            "window_seconds": round(window, 1),
+            "rejected": sum(counts.values()),
+            "by_endpoint": dict(by_endpoint),
+            "top_keys": [
+                {"endpoint": endpoint, "scope": scope, "key": key, "rejected": count}
+                for (endpoint, scope, key), count in counts.most_common(SUMMARY_TOP_KEYS)
+            ]
+        }
+
+
+rejections = _RejectionSummary()
+
+
+def flush_audit_summary(force: bool = False):
+    """Zapíše souhrn odmítnutí, je-li na řadě; přes write-behind frontu, pokud běží"""
+    details = rejections.take_due(force)
+    if details is None:
+        return
+    entry = audit.build_entry(None, "RATE_LIMITED", "auth", None, details)
+    if audit.should_enqueue("RATE_LIMITED") and audit.queue.enqueue(entry):
+        return
+    try:
+        audit.write_entries([entry])
+    except Exception:
+        logger.exception("Failed to write rate limit audit summary")
+
+
+def _client_ip(request: Request) -> str:
+    # Za proxy je potřeba spouštět uvicorn s --proxy-headers, jinak jde o adresu proxy
+    return request.client.host if request.client else "unknown"
+
+
+def _take(scope: str, key: str, rate_per_minute: float, burst: float) -> float:
+    try:
+        return backend.take(f"{scope}:{key[:MAX_KEY_LENGTH]}", rate_per_minute / 60, burst)
+    except Exception:
+        # Výpadek sdíleného backendu nesmí zablokovat přihlašování
+        logger.exception("Rate limit backend failed, allowing request")
+        return 0.0
+
+
+async def _check(request: Request, endpoint: str, username=None):
+    if not RATE_LIMIT_ENABLED:
+        return
+
+    checks = [("ip", _client_ip(request), RATE_LIMIT_IP_PER_MINUTE, RATE_LIMIT_IP_BURST)]
+    if isinstance(username, str) and username:
+        checks.append(("username", username, RATE_LIMIT_USERNAME_PER_MINUTE, RATE_LIMIT_USERNAME_BURST))
+
+    for scope, key, rate, burst in checks:
+        wait = _take(scope, key, rate, burst)
+        if wait > 0:
+            RATE_LIMITED.inc(endpoint, scope)
+            rejections.add(endpoint, scope, key[:MAX_KEY_LENGTH])
+            if rejections.due():
+                await run_in_threadpool(flush_audit_summary)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+
+    # Souhrn se zapíše i po odeznění útoku, s prvním dalším požadavkem po intervalu
+    if rejections.due():
+        await run_in_threadpool(flush_audit_summary)
+
+
+async def limit_salts(request: Request):
+    await _check(request, "salts", request.query_params.get("username"))
+
+
+async def limit_login(request: Request):
+    # Tělo už FastAPI načetlo před řešením závislostí, request.json() vrací uložený výsledek
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    await _check(request, "login", body.get("username") if isinstance(body, dict) else None)
+
+
+async def limit_register(request: Request):
+    await _check(request, "register")
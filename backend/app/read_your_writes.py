@@ -0,0 +1,100 @@
+"""Read-your-writes přes read repliky napříč workery a pody.
+
+Odpověď na zapisující požadavek (jiná metoda než GET/HEAD/OPTIONS) nese čas
+zápisu podepsaný SECRET_KEY, v cookie LAST_WRITE_COOKIE a v hlavičce
+X-Last-Write. Prohlížeč cookie posílá sám, ostatní klienti mohou hlavičku
+vracet v dalších požadavcích. Dokud od podepsaného zápisu neuplynulo
+REPLICA_STICKY_SECONDS, get_read_db čte z primární databáze, ať požadavek
+obslouží kterýkoli worker. Bez cookie i hlavičky zbývá jen paměť workeru
+(database._recent_writers), tedy stejný proces.
+"""
+import hashlib
+import hmac
+import math
+import time
+from http.cookies import CookieError, SimpleCookie
+from typing import Optional
+
+from . import database
+from .auth import SECRET_KEY
+
+LAST_WRITE_COOKIE = "passowl_last_write"
+LAST_WRITE_HEADER = "x-last-write"
+# Tolerance rozdílu hodin mezi pody, novější čas zápisu se odmítne
+CLOCK_SKEW_SECONDS = 2.0
+
+
+def _signature(written_at_ms: int) -> str:
+    return hmac.new(SECRET_KEY.encode(), f"last-write:{written_at_ms}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def sign_write_time(written_at: float) -> str:
+    written_at_ms = int(written_at * 1000)
+    return f"{written_at_ms}.{_signature(written_at_ms)}"
+
+
+def verified_write_time(token: Optional[str]) -> Optional[float]:
+    """Čas zápisu z podepsaného tokenu, None pro chybějící nebo neplatný token"""
+    if not token:
+        return None
+    written_at_ms, _, signature = token.strip().partition(".")
+    if not written_at_ms.isdigit() or not hmac.compare_digest(signature, _signature(int(written_at_ms))):
+        return None
+    return int(written_at_ms) / 1000
+
+
+def is_recent_write(written_at: Optional[float], now: Optional[float] = None) -> bool:
+    if written_at is None:
+        return False
+    now = time.time() if now is None else now
+    return now - database.REPLICA_STICKY_SECONDS < written_at <= now + CLOCK_SKEW_SECONDS
+
+
+def _request_token(headers: dict) -> Optional[str]:
+    token = headers.get(LAST_WRITE_HEADER.encode())
+    if token:
+        return token.decode("latin-1")
+    cookie_header = headers.get(b"cookie")
+    if not cookie_header:
+        return None
+    cookies = SimpleCookie()
+    try:
+        cookies.load(cookie_header.decode("latin-1"))
+    except CookieError:
+        return None
+    morsel = cookies.get(LAST_WRITE_COOKIE)
+    return morsel.value if morsel else None
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or database.read_replicas is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if is_recent_write(verified_write_time(_request_token(headers))):
+            scope.setdefault("state", {})["recent_write"] = True
+
+        if scope["method"] in database.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # U běžných odpovědí je handler v tuto chvíli hotový i s commitem
+                token = sign_write_time(time.time())
+                cookie = (f"{LAST_WRITE_COOKIE}={token}; Max-Age={math.ceil(database.REPLICA_STICKY_SECONDS)}; "
+                          f"Path=/; HttpOnly; SameSite=Lax")
+                if scope.get("scheme") == "https":
+                    cookie += "; Secure"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (LAST_WRITE_HEADER.encode(), token.encode()),
+                    (b"set-cookie", cookie.encode("latin-1")),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,24 @@
+"""Rychlá serializace velkých list odpovědí.
+
+FastAPI výsledek routy s response_model znovu validuje, převádí na dict přes
+jsonable_encoder a teprve pak serializuje stdlib json. U seznamů stovek
+zašifrovaných blobů to dominuje CPU. ModelJSONResponse serializuje hotový
+Pydantic model přímo (model_dump_json v pydantic-core) a FastAPI ho vrací bez
+další validace. response_model na routě zůstává kvůli OpenAPI dokumentaci.
+"""
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class ModelJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode("utf-8")
+        return super().render(content)
+
+
+def model_response(content: BaseModel, response: Response) -> ModelJSONResponse:
+    """Vrátí model jako ModelJSONResponse s hlavičkami nastavenými na response závislosti routy"""
+    # Hlavičky (např. ETag) z injektované Response se při vrácení vlastní Response nepřenáší samy
+    return ModelJSONResponse(content, headers=response.headers)
@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import crud, schemas, database, auth
+from datetime import datetime
+import csv
+import io
+from .. import crud, schemas, database, auth, ndjson, profiler
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+AUDIT_EXPORT_FORMATS = {"ndjson": ndjson.MEDIA_TYPE, "csv": "text/csv"}
+AUDIT_EXPORT_COLUMNS = ["id", "created_at", "user_id", "username", "action", "resource_type", "resource_id", "details"]
+# Buňky začínající těmito znaky tabulkové procesory vyhodnotí jako vzorec
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
 
 @router.get("/users", response_model=List[schemas.User])
 def get_all_users(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(database.get_db),
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     _: schemas.TokenData = Depends(auth.require_admin)  # Added admin check
 ):
     users = crud.get_users(db, skip=skip, limit=limit)
@@ -27,16 +36,50 @@ def get_all_users(
     return users
 
 
+@router.post("/users/bulk", response_model=schemas.UserBulkResponse)
+def create_users_bulk(
+    bulk: schemas.UserBulkCreate,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    _: schemas.TokenData = Depends(auth.require_admin)
+):
+    """Hromadné založení uživatelů z registračních dat připravených klientem"""
+    try:
+        result = crud.create_users_bulk(db, bulk.users, bulk.roles, current_user.id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    # Noví uživatelé nesmí zůstat v negativní cache /auth/salts
+    auth.forget_missing_users(*(item["username"] for item in result["results"] if item["id"] is not None))
+    return result
+
+
 @router.get("/audit-logs", response_model=List[schemas.AuditLog])
 def get_audit_logs(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    resource_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(database.get_db),
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     _: schemas.TokenData = Depends(auth.require_admin)  # Added admin check
 ):
-    logs = crud.get_audit_logs(db, skip=skip, limit=limit, user_id=user_id)
+    try:
+        result = crud.get_audit_logs(db, skip=skip, limit=limit, user_id=user_id, action=action,
+                                     resource_type=resource_type, resource_id=resource_id,
+                                     created_from=created_from, created_to=created_to, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    # Odpověď zůstává polem, cursor další stránky jde v hlavičce
+    if result["next_cursor"]:
+        response.headers["X-Next-Cursor"] = result["next_cursor"]
     
     # Log admin action
     crud.create_audit_log(
@@ -46,7 +89,97 @@ def get_audit_logs(
         resource_type="audit_log"
     )
     
-    return logs
+    return result["items"]
+
+
+@router.get("/audit-logs/export")
+def export_audit_logs(
+    export_format: str = Query("ndjson", alias="format"),
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    resource_type: Optional[str] = None,
+    resource_id: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    _: schemas.TokenData = Depends(auth.require_admin)
+):
+    """Streamovaný export filtrovaného audit logu jako CSV nebo NDJSON"""
+    if export_format not in AUDIT_EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, use one of: {', '.join(AUDIT_EXPORT_FORMATS)}"
+        )
+
+    filters = {
+        "user_id": user_id,
+        "action": action,
+        "resource_type": resource_type,
+        "resource_id": resource_id,
+        "created_from": created_from,
+        "created_to": created_to
+    }
+    crud.create_audit_log(
+        db=db,
+        user_id=current_user.id,
+        action="ADMIN_EXPORT_AUDIT_LOGS",
+        resource_type="audit_log",
+        details={"format": export_format, **{key: str(value) for key, value in filters.items() if value is not None}}
+    )
+
+    def generate():
+        # Vlastní session, stream běží i po ukončení závislostí požadavku
+        export_db = database.SessionLocal()
+        try:
+            logs = crud.iter_audit_logs(export_db, **filters)
+            if export_format == "csv":
+                yield from _csv_lines(logs)
+            else:
+                for log in logs:
+                    yield ndjson.dumps_line(log.model_dump(mode="json"))
+        finally:
+            export_db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=AUDIT_EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="audit-logs.{export_format}"'}
+    )
+
+
+
+@router.get("/query-profile")
+def get_query_profile(_: schemas.TokenData = Depends(auth.require_admin)):
+    """Klouzavý report profilovaných požadavků (agregace podle routy + poslední požadavky)"""
+    return {
+        "enabled": profiler.QUERY_PROFILER_ENABLED,
+        "repeat_threshold": profiler.QUERY_PROFILER_REPEAT_THRESHOLD,
+        **profiler.report.snapshot()
+    }
+
+
+@router.delete("/query-profile")
+def clear_query_profile(_: schemas.TokenData = Depends(auth.require_admin)):
+    profiler.report.clear()
+    return {"message": "Query profile cleared"}
+
 
+def _csv_cell(value):
+    # username a details zadávají uživatelé, export se otevírá v tabulkovém procesoru
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
 
 
+def _csv_lines(logs):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(AUDIT_EXPORT_COLUMNS)
+    for log in logs:
+        writer.writerow([_csv_cell(getattr(log, column)) for column in AUDIT_EXPORT_COLUMNS])
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,189 @@
+"""Async verze nejvytíženějších rout nad asyncpg (ASYNC_DB_ENABLED=true).
+
+Router se v main.py registruje před synchronními routery, takže pro stejné
+cesty a metody mají tyto handlery přednost. Ostatní routy zůstávají synchronní.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import timedelta
+from typing import Optional
+from .. import crud_async, schemas, database, auth, conditional, ratelimit, responses
+
+router = APIRouter()
+
+
+# Authentication
+@router.get("/auth/salts", response_model=schemas.UserSalts, tags=["authentication"],
+            dependencies=[Depends(ratelimit.limit_salts)])
+async def get_user_salts(
+    username: str,
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Get user's salts for login process - public endpoint"""
+    # Session se ke spojení dostane jen při minutí cache
+    salts = auth.lookup_cached_salts(username)
+    if salts is None:
+        salts = await auth.load_user_salts_async(db, username)
+    if salts is auth.USER_MISSING:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    return salts
+
+
+@router.post("/auth/login", response_model=schemas.Token, tags=["authentication"],
+             dependencies=[Depends(ratelimit.limit_login)])
+async def login_user(user_credentials: schemas.UserLogin, db: AsyncSession = Depends(database.get_async_db)):
+    user = await auth.authenticate_user_async(db, user_credentials.username, user_credentials.login_password_hash)
+    if not user:
+        # Log failed login attempt
+        await crud_async.create_audit_log(
+            db=db,
+            user_id=None,
+            action="LOGIN_FAILED",
+            resource_type="user",
+            details={"username": user_credentials.username}
+        )
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    auth.cache_user_salts(user)
+    user_roles = [role.name for role in user.roles]
+
+    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = auth.create_access_token(
+        data={"sub": user.username, "roles": user_roles},
+        expires_delta=access_token_expires
+    )
+
+    # Log successful login
+    await crud_async.create_audit_log(
+        db=db,
+        user_id=user.id,
+        action="LOGIN_SUCCESS",
+        resource_type="user",
+        resource_id=str(user.id)
+    )
+
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+# Credentials
+@router.get("/credentials/", response_model=schemas.CredentialListResponse, tags=["credentials"])
+async def get_credentials(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: str = None,
+    sort_direction: str = None,
+    filter_category: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    etag = conditional.vault_etag(request, current_user.id, await crud_async.get_vault_revision(db, current_user.id))
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+    response.headers.update(conditional.headers(etag))
+
+    try:
+        result = await crud_async.get_credentials(db, user_id=current_user.id, skip=skip, limit=limit, sort_by=sort_by,
+                                                  sort_direction=sort_direction, filter_category=filter_category,
+                                                  cursor=cursor, include_total=include_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return responses.model_response(
+        schemas.CredentialListResponse(items=result["items"], total=result["total"], next_cursor=result["next_cursor"]),
+        response
+    )
+
+
+@router.get("/credentials/{credential_id}", response_model=schemas.Credential, tags=["credentials"])
+async def get_credential(
+    credential_id: int,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    credential = await crud_async.get_credential(db, credential_id=credential_id, user_id=current_user.id)
+    if credential is None:
+        raise HTTPException(status_code=404, detail="Credential not found")
+    return credential
+
+
+# Secure notes
+@router.get("/secure-notes/", response_model=schemas.SecureNoteListResponse, tags=["secure-notes"])
+async def get_secure_notes(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    etag = conditional.vault_etag(request, current_user.id, await crud_async.get_vault_revision(db, current_user.id))
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+    response.headers.update(conditional.headers(etag))
+
+    try:
+        result = await crud_async.get_secure_notes(db, user_id=current_user.id, skip=skip, limit=limit,
+                                                   cursor=cursor, include_total=include_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return responses.model_response(
+        schemas.SecureNoteListResponse(items=result["items"], total=result["total"], next_cursor=result["next_cursor"]),
+        response
+    )
+
+
+@router.get("/secure-notes/{note_id}", response_model=schemas.SecureNote, tags=["secure-notes"])
+async def get_secure_note(
+    note_id: int,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    note = await crud_async.get_secure_note(db, note_id=note_id, user_id=current_user.id)
+    if note is None:
+        raise HTTPException(status_code=404, detail="Secure note not found")
+    return note
+
+
+# Sharing
+@router.get("/api/sharing/received", response_model=schemas.SharedCredentialListResponse, tags=["sharing"])
+async def get_received_shared_credentials(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user_async)
+):
+    """Získání hesel sdílených s aktuálním uživatelem"""
+    etag = conditional.vault_etag(request, current_user.id, await crud_async.get_vault_revision(db, current_user.id))
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+    response.headers.update(conditional.headers(etag))
+
+    try:
+        result = await crud_async.get_shared_credentials_received(db, current_user.id, skip=skip, limit=limit,
+                                                                  cursor=cursor, include_total=include_total)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return responses.model_response(
+        schemas.SharedCredentialListResponse(items=result["items"], total=result["total"], next_cursor=result["next_cursor"]),
+        response
+    )
@@ -1,31 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from .. import crud, schemas, database, auth
+from .. import crud, schemas, database, auth, ratelimit
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
-@router.get("/salts", response_model=schemas.UserSalts)
-def get_user_salts(
+@router.get("/salts", response_model=schemas.UserSalts, dependencies=[Depends(ratelimit.limit_salts)])
+async def get_user_salts(
     username: str,
-    db: Session = Depends(database.get_db)
+    request: Request
 ):
     """Get user's salts for login process - public endpoint"""
-    user = crud.get_user_by_username(db, username=username)
-    if not user:
+    # Zásah cache se vyřídí přímo v event loopu, do threadpoolu a databáze jde jen minutí
+    salts = auth.lookup_cached_salts(username)
+    if salts is None:
+        salts = await run_in_threadpool(_load_user_salts, request, username)
+    if salts is auth.USER_MISSING:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    
-    return schemas.UserSalts(
-        login_salt=user.login_salt,
-        encryption_salt=user.encryption_salt
-    )
+
+    return salts
 
 
-@router.post("/register", response_model=schemas.User)
+def _load_user_salts(request: Request, username: str):
+    with database.read_session(request) as db:
+        return auth.load_user_salts(db, username)
+
+
+@router.post("/register", response_model=schemas.User, dependencies=[Depends(ratelimit.limit_register)])
 def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
     # Check if user already exists
     db_user = crud.get_user_by_username(db, username=user.username)
@@ -50,7 +56,7 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_d
     return db_user
 
 
-@router.post("/login", response_model=schemas.Token)
+@router.post("/login", response_model=schemas.Token, dependencies=[Depends(ratelimit.limit_login)])
 def login_user(user_credentials: schemas.UserLogin, db: Session = Depends(database.get_db)):
     user = auth.authenticate_user(db, user_credentials.username, user_credentials.login_password_hash)
     if not user:
@@ -68,6 +74,9 @@ def login_user(user_credentials: schemas.UserLogin, db: Session = Depends(databa
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Soli se zahřejí pro další přihlášení
+    auth.cache_user_salts(user)
+
     # Get user roles
     user_roles = [role.name for role in user.roles]
     
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
-from .. import crud, schemas, database, auth
+from .. import crud, schemas, database, auth, conditional
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
 @router.get("/", response_model=List[schemas.PasswordCategory])
 def get_categories(
-    current_user: database.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    request: Request,
+    response: Response,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
 ):
+    etag = conditional.vault_etag(request, current_user.id, crud.get_vault_revision(db, current_user.id))
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+    response.headers.update(conditional.headers(etag))
+
     categories = crud.get_categories(db, user_id=current_user.id)
     return categories
 
@@ -18,8 +25,8 @@ def get_categories(
 @router.get("/{category_id}", response_model=schemas.PasswordCategory)
 def get_category(
     category_id: int,
-    current_user: database.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
 ):
     category = crud.get_category(db, category_id=category_id, user_id=current_user.id)
     if category is None:
@@ -30,7 +37,7 @@ def get_category(
 @router.post("/", response_model=schemas.PasswordCategory)
 def create_category(
     category: schemas.PasswordCategoryCreate,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     db_category = crud.create_category(db=db, category=category, user_id=current_user.id)
@@ -51,7 +58,7 @@ def create_category(
 def update_category(
     category_id: int,
     category: schemas.PasswordCategoryUpdate,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     db_category = crud.update_category(db, category_id=category_id, user_id=current_user.id, category=category)
@@ -73,7 +80,7 @@ def update_category(
 @router.delete("/{category_id}")
 def delete_category(
     category_id: int,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     success = crud.delete_category(db, category_id=category_id, user_id=current_user.id)
@@ -1,30 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import crud, schemas, database, auth
+from .. import crud, schemas, database, auth, conditional, responses
 
 router = APIRouter(prefix="/credentials", tags=["credentials"])
 
 
 @router.get("/", response_model=schemas.CredentialListResponse)
 def get_credentials(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     sort_by: str = None,
     sort_direction: str = None,
     filter_category: Optional[int] = None,
-    current_user: database.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
 ):
-    result = crud.get_credentials(db, user_id=current_user.id, skip=skip, limit=limit, sort_by=sort_by, sort_direction=sort_direction, filter_category=filter_category)
-    return schemas.CredentialListResponse(items=result["items"], total=result["total"])
+    etag = conditional.vault_etag(request, current_user.id, crud.get_vault_revision(db, current_user.id))
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+    response.headers.update(conditional.headers(etag))
+
+    try:
+        result = crud.get_credentials(db, user_id=current_user.id, skip=skip, limit=limit, sort_by=sort_by, sort_direction=sort_direction, filter_category=filter_category,
+                                      cursor=cursor, include_total=include_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return responses.model_response(
+        schemas.CredentialListResponse(items=result["items"], total=result["total"], next_cursor=result["next_cursor"]),
+        response
+    )
 
 
 @router.get("/{credential_id}", response_model=schemas.Credential)
 def get_credential(
     credential_id: int,
-    current_user: database.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
 ):
     credential = crud.get_credential(db, credential_id=credential_id, user_id=current_user.id)
     if credential is None:
@@ -35,10 +51,12 @@ def get_credential(
 @router.post("/", response_model=schemas.Credential)
 def create_credential(
     credential: schemas.CredentialCreate,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     db_credential = crud.create_credential(db=db, credential=credential, user_id=current_user.id)
+    # Serializovat před zápisem do audit logu, jeho commit by načtené kategorie expiroval
+    response = schemas.Credential.model_validate(db_credential)
 
     # Log credential creation
     crud.create_audit_log(
@@ -49,14 +67,25 @@ def create_credential(
         resource_id=str(db_credential.id)
     )
 
-    return db_credential
+    return response
+
+
+@router.post("/batch", response_model=schemas.CredentialBatchResponse)
+def create_credentials_batch(
+    batch: schemas.CredentialBatchCreate,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Hromadný import hesel v jedné transakci (nejvýše schemas.CREDENTIAL_BATCH_MAX_ITEMS)"""
+    # Souhrnný audit záznam zapisuje crud ve stejné transakci
+    return crud.create_credentials_batch(db=db, credentials=batch.items, user_id=current_user.id)
 
 
 @router.put("/{credential_id}", response_model=schemas.Credential)
 def update_credential(
     credential_id: int,
     credential: schemas.CredentialUpdate,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     db_credential = crud.update_credential(
@@ -67,6 +96,7 @@ def update_credential(
     )
     if db_credential is None:
         raise HTTPException(status_code=404, detail="Credential not found")
+    response = schemas.Credential.model_validate(db_credential)
 
     # Log credential update
     crud.create_audit_log(
@@ -77,13 +107,13 @@ def update_credential(
         resource_id=str(credential_id)
     )
 
-    return db_credential
+    return response
 
 
 @router.delete("/{credential_id}")
 def delete_credential(
     credential_id: int,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     success = crud.delete_credential(db=db, credential_id=credential_id, user_id=current_user.id)
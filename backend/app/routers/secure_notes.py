@@ -1,27 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, schemas, database, auth
+from typing import List, Optional
+from .. import crud, schemas, database, auth, conditional, responses
 
 router = APIRouter(prefix="/secure-notes", tags=["secure-notes"])
 
 
 @router.get("/", response_model=schemas.SecureNoteListResponse)
 def get_secure_notes(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    current_user: database.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
 ):
-    result = crud.get_secure_notes(db, user_id=current_user.id, skip=skip, limit=limit)
-    return schemas.SecureNoteListResponse(items=result["items"], total=result["total"])
+    etag = conditional.vault_etag(request, current_user.id, crud.get_vault_revision(db, current_user.id))
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+    response.headers.update(conditional.headers(etag))
+
+    try:
+        result = crud.get_secure_notes(db, user_id=current_user.id, skip=skip, limit=limit,
+                                       cursor=cursor, include_total=include_total)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return responses.model_response(
+        schemas.SecureNoteListResponse(items=result["items"], total=result["total"], next_cursor=result["next_cursor"]),
+        response
+    )
 
 
 @router.get("/{note_id}", response_model=schemas.SecureNote)
 def get_secure_note(
     note_id: int,
-    current_user: database.User = Depends(auth.get_current_user),
-    db: Session = Depends(database.get_db)
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
 ):
     note = crud.get_secure_note(db, note_id=note_id, user_id=current_user.id)
     if note is None:
@@ -32,7 +48,7 @@ def get_secure_note(
 @router.post("/", response_model=schemas.SecureNote)
 def create_secure_note(
     note: schemas.SecureNoteCreate,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     db_note = crud.create_secure_note(db=db, note=note, user_id=current_user.id)
@@ -53,7 +69,7 @@ def create_secure_note(
 def update_secure_note(
     note_id: int,
     note: schemas.SecureNoteUpdate,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     db_note = crud.update_secure_note(db, note_id=note_id, user_id=current_user.id, note=note)
@@ -75,7 +91,7 @@ def update_secure_note(
 @router.delete("/{note_id}")
 def delete_secure_note(
     note_id: int,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     success = crud.delete_secure_note(db, note_id=note_id, user_id=current_user.id)
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
-from typing import List
-from .. import crud, schemas, auth, database
+from typing import List, Optional
+from .. import crud, schemas, auth, database, conditional, responses
 from ..database import get_db
 
 router = APIRouter(
@@ -10,11 +10,14 @@ router = APIRouter(
     tags=["sharing"]
 )
 
+# Maximální počet příjemců v jednom hromadném sdílení
+BULK_SHARE_MAX_RECIPIENTS = 1000
+
 @router.post("/share", response_model=schemas.SharedCredentialResponse)
 def share_credential(
     shared_credential: schemas.SharedCredentialCreate,
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Sdílení hesla s jiným uživatelem"""
     # Check if credential already exists in crud.py
@@ -41,93 +44,73 @@ def share_credential(
             )
 
     # Připoj dodatečné informace pro response
-    credential = crud.get_credential(db, db_shared.credential_id, current_user.id)
-    owner = crud.get_user(db, db_shared.owner_user_id)
-
-    response_data = schemas.SharedCredentialResponse(
-        id=db_shared.id,
-        credential_id=db_shared.credential_id,
-        owner_user_id=db_shared.owner_user_id,
-        recipient_user_id=db_shared.recipient_user_id,
-        encrypted_sharing_key=db_shared.encrypted_sharing_key,
-        encrypted_shared_data=db_shared.encrypted_shared_data,
-        sharing_iv=db_shared.sharing_iv,
-        created_at=db_shared.created_at,
-        credential_title=credential.title if credential else "",
-        credential_url=credential.url if credential else None,
-        credential_username=credential.username if credential else "",
-        owner_username=owner.username if owner else ""
-    )
+    return crud.get_shared_credential_response(db, db_shared.id)
+
+@router.post("/share/bulk", response_model=schemas.SharedCredentialBulkResponse)
+def share_credential_bulk(
+    bulk: schemas.SharedCredentialBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
+):
+    """Sdílení jednoho hesla s více uživateli v jedné transakci"""
+    if len(bulk.recipients) > BULK_SHARE_MAX_RECIPIENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Bulk share can contain at most {BULK_SHARE_MAX_RECIPIENTS} recipients"
+        )
 
-    return response_data
+    result = crud.create_shared_credentials_bulk(db, bulk.credential_id, bulk.recipients, current_user.id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot share this credential"
+        )
+    return result
 
 @router.get("/received", response_model=schemas.SharedCredentialListResponse)
 def get_received_shared_credentials(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Získání hesel sdílených s aktuálním uživatelem"""
-    result = crud.get_shared_credentials_received(db, current_user.id, skip=skip, limit=limit)
-
-    response_list = []
-    for shared in result["items"]:
-        credential = crud.get_credential(db, shared.credential_id, shared.owner_user_id)
-        owner = crud.get_user(db, shared.owner_user_id)
-
-        response_list.append(schemas.SharedCredentialResponse(
-            id=shared.id,
-            credential_id=shared.credential_id,
-            owner_user_id=shared.owner_user_id,
-            recipient_user_id=shared.recipient_user_id,
-            encrypted_sharing_key=shared.encrypted_sharing_key,
-            encrypted_shared_data=shared.encrypted_shared_data,
-            sharing_iv=shared.sharing_iv,
-            created_at=shared.created_at,
-            credential_title=credential.title if credential else "",
-            credential_url=credential.url if credential else None,
-            credential_username=credential.username if credential else "",
-            owner_username=owner.username if owner else ""
-        ))
-
-    return schemas.SharedCredentialListResponse(items=response_list, total=result["total"])
+    etag = conditional.vault_etag(request, current_user.id, crud.get_vault_revision(db, current_user.id))
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+    response.headers.update(conditional.headers(etag))
+
+    try:
+        result = crud.get_shared_credentials_received(db, current_user.id, skip=skip, limit=limit,
+                                                      cursor=cursor, include_total=include_total)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    return responses.model_response(
+        schemas.SharedCredentialListResponse(items=result["items"], total=result["total"], next_cursor=result["next_cursor"]),
+        response
+    )
 
 @router.get("/owned", response_model=List[schemas.SharedCredentialResponse])
 def get_owned_shared_credentials(
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Získání hesel, která aktuální uživatel sdílí"""
-    shared_credentials = crud.get_shared_credentials_owned(db, current_user.id)
-
-    response_list = []
-    for shared in shared_credentials:
-        credential = crud.get_credential(db, shared.credential_id, current_user.id)
-        recipient = crud.get_user(db, shared.recipient_user_id)
-
-        response_list.append(schemas.SharedCredentialResponse(
-            id=shared.id,
-            credential_id=shared.credential_id,
-            owner_user_id=shared.owner_user_id,
-            recipient_user_id=shared.recipient_user_id,
-            encrypted_sharing_key=shared.encrypted_sharing_key,
-            encrypted_shared_data=shared.encrypted_shared_data,
-            sharing_iv=shared.sharing_iv,
-            created_at=shared.created_at,
-            credential_title=credential.title if credential else "",
-            credential_url=credential.url if credential else None,
-            credential_username=credential.username if credential else "",
-            owner_username=recipient.username if recipient else ""
-        ))
-
-    return response_list
+    return crud.get_shared_credentials_owned(db, current_user.id)
 
 @router.delete("/{shared_credential_id}")
 def delete_shared_credential(
     shared_credential_id: int,
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Zrušení sdílení hesla"""
     success = crud.delete_shared_credential(db, shared_credential_id, current_user.id)
@@ -141,8 +124,8 @@ def delete_shared_credential(
 @router.get("/users/{user_id}/public-key", response_model=schemas.UserPublicKey)
 def get_user_public_key(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Získání veřejného klíče uživatele"""
     user_key = crud.get_user_public_key(db, user_id)
@@ -156,8 +139,8 @@ def get_user_public_key(
 @router.get("/users/search")
 def search_users(
     q: str,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Vyhledání uživatelů pro sdílení"""
     if len(q) < 2:
@@ -170,8 +153,8 @@ def search_users(
 @router.get("/credential/{credential_id}/users", response_model=List[schemas.SharedUserResponse])
 def get_credential_shared_users(
     credential_id: int,
-    db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Získání seznamu uživatelů, se kterými je sdíleno dané heslo"""
     users = crud.get_shared_credential_users(db, credential_id, current_user.id)
@@ -188,7 +171,7 @@ def delete_credential_sharing(
     credential_id: int,
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Zrušení sdílení hesla s konkrétním uživatelem"""
     success = crud.delete_shared_credential_by_ids(db, credential_id, user_id, current_user.id)
@@ -206,7 +189,7 @@ def update_credential_sharing(
     user_id: int,
     shared_credential: schemas.SharedCredentialUpdate,
     db: Session = Depends(get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Aktualizace sdíleného hesla"""
     updated_shared = crud.update_shared_credential(db, credential_id, user_id, current_user.id, shared_credential)
@@ -216,23 +199,7 @@ def update_credential_sharing(
             detail="Shared credential not found or you don't have permission to update it"
         )
 
-    # Připoj dodatečné informace pro response
-    credential = crud.get_credential(db, updated_shared.credential_id, current_user.id)
-    recipient = crud.get_user(db, updated_shared.recipient_user_id)
-
-    response_data = schemas.SharedCredentialResponse(
-        id=updated_shared.id,
-        credential_id=updated_shared.credential_id,
-        owner_user_id=updated_shared.owner_user_id,
-        recipient_user_id=updated_shared.recipient_user_id,
-        encrypted_sharing_key=updated_shared.encrypted_sharing_key,
-        encrypted_shared_data=updated_shared.encrypted_shared_data,
-        sharing_iv=updated_shared.sharing_iv,
-        created_at=updated_shared.created_at,
-        credential_title=credential.title if credential else "",
-        credential_url=credential.url if credential else None,
-        credential_username=credential.username if credential else "",
-        owner_username=recipient.username if recipient else ""
+    # Připoj dodatečné informace pro response (jméno příjemce, stejně jako dosud)
+    return crud.get_shared_credential_response(
+        db, updated_shared.id, counterpart_user_id=database.SharedCredential.recipient_user_id
     )
-
-    return response_data
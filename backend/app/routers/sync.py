@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from .. import crud, schemas, database, auth
+from ..cursor import encode_cursor, decode_cursor, parse_datetime
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("", response_model=schemas.VaultSyncResponse)
+def sync_vault(
+    since: Optional[str] = None,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Delta synchronizace trezoru - bez `since` nebo s prošlým cursorem vrací celý trezor (full_resync)
+
+    Cursor se záměrně překrývá s předchozí synchronizací (SYNC_CURSOR_OVERLAP_SECONDS),
+    položky a tombstones se proto mohou opakovat a klient je slučuje podle id.
+    """
+    since_at = None
+    if since:
+        try:
+            since_at = parse_datetime(decode_cursor(since).get("synced_at"))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid sync cursor"
+            )
+
+    changes = crud.get_vault_changes(db, user_id=current_user.id, since=since_at)
+
+    return schemas.VaultSyncResponse(
+        credentials=changes["credentials"],
+        secure_notes=changes["secure_notes"],
+        categories=changes["categories"],
+        shared_credentials=changes["shared_credentials"],
+        deleted=changes["deleted"],
+        full_resync=changes["full_resync"],
+        cursor=encode_cursor({"synced_at": changes["synced_at"]})
+    )
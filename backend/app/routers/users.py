@@ -1,20 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from typing import List
-from .. import crud, schemas, database, auth
+from .. import crud, schemas, database, auth, ndjson
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/me", response_model=schemas.User)
-def get_current_user_info(current_user: database.User = Depends(auth.get_current_user)):
-    return current_user
+def get_current_user_info(
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_read_db)
+):
+    user = crud.get_user(db, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
 
 
 @router.put("/me/avatar", response_model=schemas.User)
 def update_user_avatar(
     user_update: schemas.UserUpdate,
-    current_user: database.User = Depends(auth.get_current_user),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
     if user_update.avatar_url is None:
@@ -41,7 +52,7 @@ def update_user_keys(
     public_key: str,
     encrypted_private_key: str,
     db: Session = Depends(database.get_db),
-    current_user: schemas.User = Depends(auth.get_current_user)
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Aktualizace asymetrických klíčů uživatele"""
     updated_user = crud.update_user_keys(db, current_user.id, public_key, encrypted_private_key)
@@ -53,31 +64,144 @@ def update_user_keys(
     return {"message": "Keys updated successfully"}
 
 
+
+# Počet záznamů jednoho typu, po kterém se při rotaci klíčů hromadně aktualizuje
+ROTATION_CHUNK_SIZE = 500
+
+
+class _KeyRotationConflict(Exception):
+    """Během streamu přibyly nebo zmizely záznamy, které musí rotace pokrýt"""
+
+
+class _KeyRotation:
+    """Stav rotace klíčů - záznamy se aktualizují po dávkách v jedné transakci.
+
+    Nový pár klíčů se uloží jen tehdy, pokud stream pokryl všechna přijatá
+    sdílení (jinak by jejich klíče zůstaly zašifrované starým veřejným klíčem).
+    Hesla a poznámky jsou volitelné, ale pokud stream obsahuje nějaké, musí
+    obsahovat všechny.
+
+    Cíle se čtou na začátku bez zámku, aby dlouhý stream neblokoval sdílení
+    uživateli. Při commitu se řádek uživatele zamkne a cíle se přečtou znovu;
+    pokud se mezitím změnily, rotace skončí konfliktem a klient ji zopakuje.
+    """
+
+    RECORD_SCHEMAS = {
+        "credential": ("credentials", schemas.KeyRotationCredential),
+        "secure_note": ("secure_notes", schemas.KeyRotationSecureNote),
+        "shared_credential": ("shared_credentials", schemas.KeyRotationSharedKey)
+    }
+
+    def __init__(self, db: Session, user_id: int, username: str):
+        self.db = db
+        self.user_id = user_id
+        self.username = username
+        self.targets = crud.get_key_rotation_targets(db, user_id)
+        self.keys = None
+        self.pending_rows = {"credentials": [], "secure_notes": [], "shared_credentials": []}
+        self.seen = {"credentials": set(), "secure_notes": set(), "shared_credentials": set()}
+
+    def add(self, record: dict):
+        record_type = record.get("type")
+        if record_type == "keys":
+            if self.keys is not None:
+                raise ValueError("Duplicate keys record")
+            self.keys = schemas.KeyRotationKeys.model_validate(record)
+            return
+        if record_type not in self.RECORD_SCHEMAS:
+            raise ValueError(f"Unknown record type: {record_type}")
+
+        kind, schema = self.RECORD_SCHEMAS[record_type]
+        row = schema.model_validate(record)
+        if row.id not in self.targets[kind]:
+            raise ValueError(f"Unknown {record_type} id: {row.id}")
+        if row.id in self.seen[kind]:
+            raise ValueError(f"Duplicate {record_type} id: {row.id}")
+        if len(getattr(row, "encryption_iv", "")) > database.Credential.encryption_iv.type.length:
+            raise ValueError("encryption_iv is too long")
+        self.seen[kind].add(row.id)
+        self.pending_rows[kind].append(row)
+
+    def pending(self) -> int:
+        return max(len(rows) for rows in self.pending_rows.values())
+
+    def flush(self):
+        crud.rotate_credentials(self.db, self.user_id, self.pending_rows["credentials"])
+        crud.rotate_secure_notes(self.db, self.user_id, self.pending_rows["secure_notes"])
+        crud.rotate_received_share_keys(self.db, self.user_id, self.pending_rows["shared_credentials"])
+        self.pending_rows = {kind: [] for kind in self.pending_rows}
+
+    def commit(self) -> dict:
+        if self.keys is None:
+            raise ValueError("Missing keys record")
+        missing_shares = len(self.targets["shared_credentials"]) - len(self.seen["shared_credentials"])
+        if missing_shares:
+            raise ValueError(f"Missing {missing_shares} received shared credential keys")
+        for kind in ("credentials", "secure_notes"):
+            if self.seen[kind] and len(self.seen[kind]) != len(self.targets[kind]):
+                raise ValueError(f"Missing {len(self.targets[kind]) - len(self.seen[kind])} {kind}")
+
+        current = crud.get_key_rotation_targets(self.db, self.user_id, lock=True)
+        for kind in ("shared_credentials", "credentials", "secure_notes"):
+            required = kind == "shared_credentials" or self.seen[kind]
+            if required and set(current[kind]) != set(self.targets[kind]):
+                raise _KeyRotationConflict(f"{kind} changed during key rotation, retry")
+
+        self.flush()
+        crud.set_user_keys(self.db, self.user_id, self.keys)
+        counts = {kind: len(ids) for kind, ids in self.seen.items()}
+        crud.create_audit_log(
+            db=self.db,
+            user_id=self.user_id,
+            action="KEYS_ROTATED",
+            resource_type="user",
+            resource_id=str(self.user_id),
+            details=counts,
+            commit=False
+        )
+        # Vlastníci sdílení vidí nový klíč příjemce ve svém seznamu sdílených hesel
+        crud.bump_vault_revision(self.db, self.user_id, *self.targets["shared_credentials"].values())
+        self.db.commit()
+        # set_user_keys je Core UPDATE, ORM eventy cache přihlášených uživatelů nevyčistí
+        auth.invalidate_user_cache(self.username)
+        return counts
+
+
+@router.post("/keys/rotate", response_model=schemas.KeyRotationResult)
+async def rotate_user_keys(
+    request: Request,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Rotace páru klíčů s přešifrovanými daty z NDJSON streamu v jedné transakci.
+
+    Záznamy: {"type": "keys", ...}, {"type": "credential", "id", ...},
+    {"type": "secure_note", "id", ...}, {"type": "shared_credential", "id", "encrypted_sharing_key"}
+    """
+    try:
+        rotation = await run_in_threadpool(_KeyRotation, db, current_user.id, current_user.username)
+        async for line_number, record in ndjson.iter_request_lines(request):
+            try:
+                rotation.add(record)
+            except ValidationError:
+                raise ValueError(f"Line {line_number}: invalid record")
+            except ValueError as exc:
+                raise ValueError(f"Line {line_number}: {exc}")
+            if rotation.pending() >= ROTATION_CHUNK_SIZE:
+                await run_in_threadpool(rotation.flush)
+        return await run_in_threadpool(rotation.commit)
+    except ValueError as exc:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except _KeyRotationConflict as exc:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+
 @router.get("/me/stats", response_model=schemas.UserStats)
 def get_current_user_stats(
-    db: Session = Depends(database.get_db),
-    current_user: database.User = Depends(auth.get_current_user)
+    db: Session = Depends(database.get_read_db),
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user)
 ):
     """Získá statistiky pro aktuálního uživatele"""
-    # Get count of user's own credentials
-    credentials = crud.get_credentials(db, current_user.id)
-    own_credentials_count = credentials["total"]
-
-    # Get count of credentials shared with the user
-    shared_credentials = crud.get_shared_credentials_received(db, current_user.id)
-    shared_credentials_count = shared_credentials["total"]
-
-    # Get count of secure notes
-    secure_notes = crud.get_secure_notes(db, current_user.id)
-    secure_notes_count = secure_notes["total"]
-
-    # Get count of categories
-    categories = crud.get_categories(db, current_user.id)
-    categories_count = len(categories)
-
-    return schemas.UserStats(
-        own_credentials_count=own_credentials_count,
-        shared_credentials_count=shared_credentials_count,
-        secure_notes_count=secure_notes_count,
-        categories_count=categories_count
-    )
+    return crud.get_user_stats(db, current_user.id)
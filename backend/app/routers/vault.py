@@ -0,0 +1,152 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from .. import crud, schemas, database, auth, ndjson
+
+router = APIRouter(prefix="/vault", tags=["vault"])
+
+EXPORT_FORMAT = "passowl-vault"
+EXPORT_VERSION = 1
+
+# Počet záznamů jednoho typu, po kterém se při importu hromadně vkládá
+IMPORT_CHUNK_SIZE = 500
+
+
+@router.get("/export")
+def export_vault(
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Export celého (zašifrovaného) trezoru jako NDJSON stream"""
+    crud.create_audit_log(
+        db=db,
+        user_id=current_user.id,
+        action="VAULT_EXPORTED",
+        resource_type="vault"
+    )
+
+    user_id = current_user.id
+
+    def generate():
+        # Vlastní session, stream běží i po ukončení závislostí požadavku
+        export_db = database.SessionLocal()
+        try:
+            yield ndjson.dumps_line({"type": "header", "format": EXPORT_FORMAT, "version": EXPORT_VERSION})
+            for record in crud.iter_vault_export(export_db, user_id):
+                yield ndjson.dumps_line(record)
+        finally:
+            export_db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=ndjson.MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="passowl-vault.ndjson"'}
+    )
+
+
+class _VaultImport:
+    """Stav importu - bufferuje záznamy a vkládá je po dávkách v jedné transakci"""
+
+    def __init__(self, db: Session, user_id: int):
+        self.db = db
+        self.user_id = user_id
+        self.categories = []
+        self.credentials = []
+        self.links = []
+        self.notes = []
+        self.category_ids = {}
+        self.credential_ids = {}
+        self.counts = {"categories": 0, "credentials": 0, "credential_categories": 0, "secure_notes": 0, "skipped": 0}
+
+    def add(self, record: dict):
+        record_type = record.get("type")
+        if record_type == "header":
+            if record.get("format") != EXPORT_FORMAT or record.get("version") != EXPORT_VERSION:
+                raise ValueError("Unsupported export format")
+        elif record_type == "category":
+            self.categories.append((record.get("id"), schemas.PasswordCategoryCreate.model_validate(record)))
+        elif record_type == "credential":
+            credential = schemas.CredentialBase.model_validate(record)
+            if len(credential.encryption_iv) > database.Credential.encryption_iv.type.length:
+                raise ValueError("encryption_iv is too long")
+            self.credentials.append((record.get("id"), credential))
+        elif record_type == "credential_category":
+            self.links.append((record.get("credential_id"), record.get("category_id")))
+        elif record_type == "secure_note":
+            note = schemas.SecureNoteCreate.model_validate(record)
+            if len(note.encryption_iv) > database.SecureNote.encryption_iv.type.length:
+                raise ValueError("encryption_iv is too long")
+            self.notes.append(note)
+        else:
+            raise ValueError(f"Unknown record type: {record_type}")
+
+    def pending(self) -> int:
+        return max(len(self.categories), len(self.credentials), len(self.links), len(self.notes))
+
+    def flush(self):
+        # Pořadí respektuje závislosti: vazby potřebují nová id kategorií i hesel
+        if self.categories:
+            self.category_ids.update(crud.import_categories(self.db, self.user_id, self.categories))
+            self.counts["categories"] += len(self.categories)
+            self.categories = []
+        if self.credentials:
+            self.credential_ids.update(crud.import_credentials(self.db, self.user_id, self.credentials))
+            self.counts["credentials"] += len(self.credentials)
+            self.credentials = []
+        if self.links:
+            links = {
+                (self.credential_ids[credential_id], self.category_ids[category_id])
+                for credential_id, category_id in self.links
+                if credential_id in self.credential_ids and category_id in self.category_ids
+            }
+            crud.import_credential_category_links(
+                self.db, [{"credential_id": credential_id, "category_id": category_id} for credential_id, category_id in links]
+            )
+            self.counts["credential_categories"] += len(links)
+            self.counts["skipped"] += len(self.links) - len(links)
+            self.links = []
+        if self.notes:
+            crud.import_secure_notes(self.db, self.user_id, self.notes)
+            self.counts["secure_notes"] += len(self.notes)
+            self.notes = []
+
+    def commit(self):
+        self.flush()
+        crud.create_audit_log(
+            db=self.db,
+            user_id=self.user_id,
+            action="VAULT_IMPORTED",
+            resource_type="vault",
+            details=self.counts,
+            commit=False
+        )
+        crud.bump_vault_revision(self.db, self.user_id)
+        self.db.commit()
+
+
+@router.post("/import", response_model=schemas.VaultImportResult)
+async def import_vault(
+    request: Request,
+    current_user: schemas.UserPrincipal = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Import trezoru z NDJSON streamu (formát /vault/export) v jedné transakci"""
+    vault_import = _VaultImport(db, current_user.id)
+    try:
+        async for line_number, record in ndjson.iter_request_lines(request):
+            try:
+                vault_import.add(record)
+            except ValidationError:
+                raise ValueError(f"Line {line_number}: invalid record")
+            except ValueError as exc:
+                raise ValueError(f"Line {line_number}: {exc}")
+            if vault_import.pending() >= IMPORT_CHUNK_SIZE:
+                await run_in_threadpool(vault_import.flush)
+        await run_in_threadpool(vault_import.commit)
+    except ValueError as exc:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    return vault_import.counts
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, ForwardRef
 from datetime import datetime
 
@@ -22,6 +22,28 @@ class UserCreate(BaseModel):
     encrypted_private_key: str
 
 
+# Maximální počet uživatelů v jednom hromadném založení
+BULK_USERS_MAX_ITEMS = 5000
+
+
+class UserBulkCreate(BaseModel):
+    # Delší seznam odmítne už validace (422), bez validace jednotlivých položek
+    users: List[UserCreate] = Field(max_length=BULK_USERS_MAX_ITEMS)
+    roles: List[str] = ["user"]
+
+
+class UserBulkItemResult(BaseModel):
+    index: int
+    username: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class UserBulkResponse(BaseModel):
+    created: int
+    results: List[UserBulkItemResult]
+
+
 class UserLogin(BaseModel):
     username: str
     login_password_hash: str
@@ -91,6 +113,15 @@ class CredentialCreate(CredentialBase):
     category_ids: List[int] = []
 
 
+# Maximální počet hesel v jednom hromadném importu
+CREDENTIAL_BATCH_MAX_ITEMS = 5000
+
+
+class CredentialBatchCreate(BaseModel):
+    # Delší seznam odmítne už validace (422), bez validace jednotlivých položek
+    items: List[CredentialCreate] = Field(max_length=CREDENTIAL_BATCH_MAX_ITEMS)
+
+
 class CredentialUpdate(BaseModel):
     title: Optional[str] = None
     url: Optional[str] = None
@@ -110,6 +141,17 @@ class Credential(CredentialBase):
     categories: List[PasswordCategory] = []
 
 
+class CredentialBatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class CredentialBatchResponse(BaseModel):
+    created: int
+    results: List[CredentialBatchItemResult]
+
+
 # SecureNote schemas
 class SecureNoteBase(BaseModel):
     encrypted_title: str
@@ -164,6 +206,13 @@ class TokenData(BaseModel):
     roles: List[str] = []
 
 
+# Slim authenticated user (without keys and other large columns)
+class UserPrincipal(BaseModel):
+    id: int
+    username: str
+    roles: List[str] = []
+
+
 # Additional schemas for salt endpoint
 class UserSalts(BaseModel):
     login_salt: str
@@ -179,6 +228,31 @@ class SharedCredentialCreate(BaseModel):
     sharing_iv: str
 
 
+class SharedCredentialBulkRecipient(BaseModel):
+    recipient_user_id: int
+    encrypted_sharing_key: str
+    encrypted_shared_data: str
+    sharing_iv: str
+
+
+class SharedCredentialBulkCreate(BaseModel):
+    credential_id: int
+    recipients: List[SharedCredentialBulkRecipient]
+
+
+class SharedCredentialBulkItemResult(BaseModel):
+    index: int
+    recipient_user_id: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class SharedCredentialBulkResponse(BaseModel):
+    credential_id: int
+    shared: int
+    results: List[SharedCredentialBulkItemResult]
+
+
 class SharedCredentialResponse(BaseModel):
     id: int
     credential_id: int
@@ -231,19 +305,23 @@ class SharedUserResponse(BaseModel):
 
 
 # Pagination response schemas with total count
+# total je None, pokud klient požádal o include_total=false
 class CredentialListResponse(BaseModel):
     items: List[Credential]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class SharedCredentialListResponse(BaseModel):
     items: List[SharedCredentialResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class SecureNoteListResponse(BaseModel):
     items: List[SecureNote]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 # User stats schema
@@ -252,3 +330,62 @@ class UserStats(BaseModel):
     shared_credentials_count: int
     secure_notes_count: int
     categories_count: int
+
+
+# Delta sync schemas
+class DeletedItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    resource_type: str
+    resource_id: int
+    deleted_at: datetime
+
+
+class VaultSyncResponse(BaseModel):
+    credentials: List[Credential]
+    secure_notes: List[SecureNote]
+    categories: List[PasswordCategory]
+    shared_credentials: List[SharedCredentialResponse]
+    deleted: List[DeletedItem]
+    # True = celý trezor, klient zahodí lokální položky, které v odpovědi nejsou
+    full_resync: bool = False
+    cursor: str
+
+
+# Vault import schemas
+class VaultImportResult(BaseModel):
+    categories: int
+    credentials: int
+    credential_categories: int
+    secure_notes: int
+    skipped: int
+
+
+# Key rotation schemas (NDJSON záznamy pro POST /users/keys/rotate)
+class KeyRotationKeys(BaseModel):
+    public_key: str
+    encrypted_private_key: str
+
+
+class KeyRotationCredential(BaseModel):
+    id: int
+    encrypted_data: str
+    encryption_iv: str
+
+
+class KeyRotationSecureNote(BaseModel):
+    id: int
+    encrypted_title: str
+    encrypted_content: str
+    encryption_iv: str
+
+
+class KeyRotationSharedKey(BaseModel):
+    id: int
+    encrypted_sharing_key: str
+
+
+class KeyRotationResult(BaseModel):
+    credentials: int
+    secure_notes: int
+    shared_credentials: int
@@ -0,0 +1,90 @@
+"""Měření doby importu aplikace (studený start workeru) proti rozpočtu.
+
+Importuje app.main v čistém interpretu a odečte dobu importu samotných
+frameworků (FRAMEWORK_MODULES), kterou aplikace neovlivní: FastAPI s pydantic
+a SQLAlchemy tvoří většinu studeného startu (podle stroje 0,5-1 s). Rozpočet
+--budget se vztahuje na zbytek, tedy na to, co přidává aplikace (modely,
+schémata, stavba rout). Porovnává se nejlepší z --runs běhů, při překročení
+skončí se statusem 1. Z dalšího běhu s -X importtime vypíše moduly s nejdelší
+kumulativní dobou importu.
+
+Import nesmí otevírat spojení do databáze, proto se měří s nedostupnou
+DATABASE_URL. Spouští se z adresáře backend (rozpočet hlídá i tests/test_import_time.py):
+
+    python -m benchmarks.import_time --budget 0.75 --runs 3
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+FRAMEWORK_MODULES = ("fastapi", "pydantic", "sqlalchemy.orm", "jose.jwt")
+APP_MODULE = "app.main"
+# Rozpočet pro import aplikace nad rámec frameworků, v sekundách
+DEFAULT_BUDGET = 0.75
+# Neexistující adresář: pokus o připojení při importu by selhal
+UNREACHABLE_DATABASE_URL = "sqlite:////nonexistent/passowl-import-time/passowl.db"
+
+
+def measurement_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", UNREACHABLE_DATABASE_URL)
+    return env
+
+
+def _run(modules, env: dict, importtime: bool = False) -> subprocess.CompletedProcess:
+    code = f"import time; started = time.perf_counter(); import {', '.join(modules)}; print(time.perf_counter() - started)"
+    flags = ["-X", "importtime"] if importtime else []
+    result = subprocess.run([sys.executable, *flags, "-c", code], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+    return result
+
+
+def measure(modules, env: dict) -> float:
+    """Doba importu modulů v sekundách v čistém interpretu (bez režie -X importtime)"""
+    return float(_run(modules, env).stdout.strip().splitlines()[-1])
+
+
+def best_of(runs: int, env: dict, module: str = APP_MODULE) -> dict:
+    """Nejlepší doby importu frameworků a aplikace z `runs` běhů a jejich rozdíl"""
+    framework = min(measure(FRAMEWORK_MODULES, env) for _ in range(runs))
+    total = min(measure([module], env) for _ in range(runs))
+    return {"framework": framework, "total": total, "app": max(0.0, total - framework)}
+
+
+def slowest_imports(module: str, env: dict) -> list:
+    """[(kumulativní µs, modul)] pro první dvě úrovně importů, od nejpomalejších"""
+    modules = []
+    for line in _run([module], env, importtime=True).stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) <= 3:
+            modules.append((int(match.group(2)), match.group(4)))
+    return sorted(modules, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the PassOwl app against a budget")
+    parser.add_argument("--module", default=APP_MODULE)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="maximum import time in seconds on top of the framework imports")
+    parser.add_argument("--runs", type=int, default=3, help="the best of N runs is compared to the budget")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest top-level imports to print")
+    args = parser.parse_args()
+
+    env = measurement_env()
+    timings = best_of(args.runs, env, args.module)
+
+    for cumulative_us, module in slowest_imports(args.module, env)[:args.top]:
+        print(f"{cumulative_us / 1000:9.1f} ms  {module}")
+    print(f"import {args.module}: best {timings['total']:.3f}s of {args.runs} runs, "
+          f"frameworks {timings['framework']:.3f}s, app {timings['app']:.3f}s, budget {args.budget:.3f}s")
+    if timings["app"] > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
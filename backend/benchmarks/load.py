@@ -0,0 +1,230 @@
+"""Zátěžový test PassOwl API nad daty z benchmarks.seed.
+
+Virtuální uživatelé se přihlásí (/auth/salts + /auth/login) a po dobu
+--duration náhodně střídají toky list, create, share, stats a login. Výsledkem
+je JSON s p50/p95/p99 latencí pro každý endpoint a celkovými requests/s, aby
+šlo porovnávat běhy před a po změně.
+
+Bez --url běží aplikace in-process (httpx.ASGITransport), jinak proti
+spuštěnému serveru. Spouští se z adresáře backend:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.load --seed-users 20 --duration 30
+    python -m benchmarks.load --url http://127.0.0.1:8000 --users 20 --concurrency 16 --output run.json
+
+Vyžaduje httpx z requirements-dev.txt.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Optional
+
+import httpx
+
+from .seed import DEFAULT_PREFIX, user_login
+
+# Relativní váhy toků jednoho virtuálního uživatele
+FLOW_WEIGHTS = {"list": 60, "create": 15, "share": 10, "stats": 10, "login": 5}
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """Percentil metodou nearest-rank nad seřazenými hodnotami"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            raise
+        self.timings[name].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, values in sorted(self.timings.items()):
+            values = sorted(values)
+            endpoints[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "requests_per_s": round(len(values) / elapsed, 2)
+            }
+        total = sum(len(values) for values in self.timings.values())
+        return {
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "requests_per_s": round(total / elapsed, 2),
+            "endpoints": endpoints
+        }
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, login: dict, recipients: list,
+                 rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.login_data = login
+        self.recipients = recipients
+        self.rng = rng
+        self.headers = {}
+        self.user_id = None
+
+    async def call(self, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self.recorder.request(self.client, name, method, url, headers=self.headers, **kwargs)
+
+    async def login(self):
+        await self.recorder.request(self.client, "GET /auth/salts", "GET", "/auth/salts",
+                                    params={"username": self.login_data["username"]})
+        response = await self.recorder.request(self.client, "POST /auth/login", "POST", "/auth/login",
+                                               json=self.login_data)
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        if self.user_id is None:
+            self.user_id = (await self.call("GET /users/me", "GET", "/users/me")).json()["id"]
+
+    async def list(self):
+        await self.call("GET /credentials/", "GET", "/credentials/", params={"limit": 100})
+        await self.call("GET /secure-notes/", "GET", "/secure-notes/", params={"limit": 100})
+        await self.call("GET /categories/", "GET", "/categories/")
+        await self.call("GET /api/sharing/received", "GET", "/api/sharing/received", params={"limit": 100})
+
+    async def create(self) -> Optional[int]:
+        response = await self.call("POST /credentials/", "POST", "/credentials/", json={
+            "title": f"Load test {self.rng.random():.8f}",
+            "url": "https://load.example.com",
+            "username": "load@example.com",
+            "encrypted_data": "QUJD" * 64,
+            "encryption_iv": "AAAAAAAAAAAAAAAA"
+        })
+        return response.json()["id"] if response.status_code == 200 else None
+
+    async def share(self):
+        recipients = [user_id for user_id in self.recipients if user_id != self.user_id]
+        credential_id = await self.create()
+        if credential_id is None or not recipients:
+            return
+        await self.call("POST /api/sharing/share", "POST", "/api/sharing/share", json={
+            "credential_id": credential_id,
+            "recipient_user_id": self.rng.choice(recipients),
+            "encrypted_sharing_key": "S0VZ" * 64,
+            "encrypted_shared_data": "REFUQQ==" * 32,
+            "sharing_iv": "AAAAAAAAAAAAAAAA"
+        })
+
+    async def stats(self):
+        await self.call("GET /users/me/stats", "GET", "/users/me/stats")
+
+    async def run(self, deadline: float):
+        flows = list(FLOW_WEIGHTS)
+        weights = list(FLOW_WEIGHTS.values())
+        while time.perf_counter() < deadline:
+            flow = self.rng.choices(flows, weights)[0]
+            try:
+                await getattr(self, flow)()
+            except httpx.HTTPError:
+                pass
+
+
+async def run_load(client: httpx.AsyncClient, users: int, concurrency: int, duration: float,
+                   prefix: str = DEFAULT_PREFIX, seed: int = 0) -> dict:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    recipients = []
+    virtual_users = [
+        VirtualUser(client, recorder, user_login(prefix, index % users), recipients, random.Random(rng.random()))
+        for index in range(concurrency)
+    ]
+    for virtual_user in virtual_users:
+        await virtual_user.login()
+        if virtual_user.user_id not in recipients:
+            recipients.append(virtual_user.user_id)
+
+    # Měří se jen ustálený běh, úvodní přihlášení ne
+    recorder.timings.clear()
+    recorder.errors.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user.run(started + duration) for virtual_user in virtual_users))
+    elapsed = time.perf_counter() - started
+    return {"duration_s": round(elapsed, 2), "concurrency": concurrency, "users": users, **recorder.report(elapsed)}
+
+
+def _in_process_client() -> httpx.AsyncClient:
+    from app import audit, ratelimit
+    from app.main import app
+
+    # ASGITransport nespouští lifespan, frontu audit logu je třeba nastartovat ručně
+    audit.start()
+    # Všichni virtuální uživatelé sdílí jednu adresu klienta, limit na IP by měřil jen odmítnutí
+    ratelimit.RATE_LIMIT_ENABLED = False
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://passowl.bench")
+
+
+async def main_async(args) -> dict:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        client = _in_process_client()
+    try:
+        async with client:
+            result = await run_load(client, args.users, args.concurrency, args.duration, args.prefix, args.seed)
+    finally:
+        if not args.url:
+            from app import audit
+            audit.stop()
+    return {"mode": "url" if args.url else "in-process", "target": args.url, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the PassOwl API")
+    parser.add_argument("--url", help="base URL of a running server, in-process when omitted")
+    parser.add_argument("--users", type=int, default=10, help="number of seeded users to log in as")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of measured load")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seed-users", type=int, default=0,
+                        help="reseed this many users (with seed defaults) into DATABASE_URL before the run")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.seed_users:
+        from app import database
+        from . import seed
+
+        database.init_db()
+        db = database.SessionLocal()
+        try:
+            seed.reset(db, args.prefix)
+            seed.seed(db, users=args.seed_users, prefix=args.prefix, rng=random.Random(args.seed))
+        finally:
+            db.close()
+        args.users = args.seed_users
+
+    report = asyncio.run(main_async(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
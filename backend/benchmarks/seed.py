@@ -0,0 +1,169 @@
+"""Generátor syntetických trezorů pro zátěžové testy.
+
+Založí N uživatelů s hesly, poznámkami, kategoriemi a sdíleními přes modely
+z app.database do databáze z DATABASE_URL (PostgreSQL nebo SQLite). Data jsou
+náhodná, ale deterministická podle --seed. Spouští se z adresáře backend:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed --users 20 --credentials 200 --reset
+
+Uživatelé se jmenují <prefix>_<i> a přihlašují se hashem z user_login().
+"""
+import argparse
+import base64
+import json
+import random
+import time
+from typing import Optional
+
+from sqlalchemy import insert
+
+from app import database
+
+DEFAULT_PREFIX = "bench"
+
+
+def user_login(prefix: str, index: int) -> dict:
+    """Přihlašovací údaje seedovaného uživatele (stejné používá benchmarks.load)"""
+    return {"username": f"{prefix}_{index}", "login_password_hash": f"{prefix}-login-hash-{index}"}
+
+
+def _blob(rng: random.Random, size: int) -> str:
+    return base64.b64encode(rng.randbytes(size)).decode()
+
+
+def _iv(rng: random.Random) -> str:
+    return _blob(rng, 12)
+
+
+def reset(db, prefix: str = DEFAULT_PREFIX) -> int:
+    """Smaže seedované uživatele, jejich data smažou kaskády"""
+    deleted = db.query(database.User).filter(
+        database.User.username.like(f"{prefix}\\_%", escape="\\")
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def seed(db, users: int = 10, credentials: int = 50, notes: int = 10, categories: int = 5, shares: int = 5,
+         prefix: str = DEFAULT_PREFIX, blob_bytes: int = 256, rng: Optional[random.Random] = None) -> dict:
+    rng = rng or random.Random(0)
+
+    user_role = db.query(database.Role).filter(database.Role.name == "user").first()
+    if not user_role:
+        user_role = database.Role(name="user")
+        db.add(user_role)
+        db.flush()
+
+    user_ids = list(db.scalars(
+        insert(database.User).returning(database.User.id, sort_by_parameter_order=True),
+        [
+            {
+                **user_login(prefix, index),
+                "login_salt": _blob(rng, 16),
+                "encryption_salt": _blob(rng, 16),
+                "public_key": _blob(rng, 294),
+                "encrypted_private_key": _blob(rng, 1232)
+            }
+            for index in range(users)
+        ]
+    ))
+    db.execute(insert(database.user_roles), [{"user_id": user_id, "role_id": user_role.id} for user_id in user_ids])
+    db.commit()
+
+    totals = {"users": len(user_ids), "credentials": 0, "notes": 0, "categories": 0, "shares": 0}
+    for user_id in user_ids:
+        category_ids = []
+        if categories:
+            category_ids = list(db.scalars(
+                insert(database.PasswordCategory).returning(database.PasswordCategory.id, sort_by_parameter_order=True),
+                [
+                    {"user_id": user_id, "name": f"Category {index}", "color_hex": f"#{rng.randrange(0x1000000):06x}"}
+                    for index in range(categories)
+                ]
+            ))
+
+        credential_ids = []
+        if credentials:
+            credential_ids = list(db.scalars(
+                insert(database.Credential).returning(database.Credential.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "user_id": user_id,
+                        "title": f"Credential {index}",
+                        "url": f"https://site{index}.example.com",
+                        "username": f"user{index}@example.com",
+                        "encrypted_data": _blob(rng, blob_bytes),
+                        "encryption_iv": _iv(rng)
+                    }
+                    for index in range(credentials)
+                ]
+            ))
+        if category_ids and credential_ids:
+            db.execute(insert(database.credential_category_links), [
+                {"credential_id": credential_id, "category_id": rng.choice(category_ids)}
+                for credential_id in credential_ids
+            ])
+
+        if notes:
+            db.execute(insert(database.SecureNote), [
+                {
+                    "user_id": user_id,
+                    "encrypted_title": _blob(rng, 32),
+                    "encrypted_content": _blob(rng, blob_bytes),
+                    "encryption_iv": _iv(rng)
+                }
+                for _ in range(notes)
+            ])
+
+        recipients = [recipient_id for recipient_id in user_ids if recipient_id != user_id]
+        share_rows = []
+        if recipients and credential_ids:
+            for credential_id in rng.sample(credential_ids, min(shares, len(credential_ids))):
+                share_rows.append({
+                    "credential_id": credential_id,
+                    "owner_user_id": user_id,
+                    "recipient_user_id": rng.choice(recipients),
+                    "encrypted_sharing_key": _blob(rng, 256),
+                    "encrypted_shared_data": _blob(rng, blob_bytes),
+                    "sharing_iv": _iv(rng)
+                })
+            db.execute(insert(database.SharedCredential), share_rows)
+
+        db.commit()
+        totals["categories"] += len(category_ids)
+        totals["credentials"] += len(credential_ids)
+        totals["notes"] += notes
+        totals["shares"] += len(share_rows)
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic PassOwl vaults for benchmarks")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--credentials", type=int, default=50, help="credentials per user")
+    parser.add_argument("--notes", type=int, default=10, help="secure notes per user")
+    parser.add_argument("--categories", type=int, default=5, help="categories per user")
+    parser.add_argument("--shares", type=int, default=5, help="shared credentials per user")
+    parser.add_argument("--blob-bytes", type=int, default=256, help="size of encrypted payloads before base64")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="delete previously seeded users first")
+    args = parser.parse_args()
+
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        started = time.perf_counter()
+        deleted = reset(db, args.prefix) if args.reset else 0
+        totals = seed(db, users=args.users, credentials=args.credentials, notes=args.notes,
+                      categories=args.categories, shares=args.shares, prefix=args.prefix,
+                      blob_bytes=args.blob_bytes, rng=random.Random(args.seed))
+    finally:
+        db.close()
+
+    print(json.dumps({**totals, "deleted_users": deleted, "seconds": round(time.perf_counter() - started, 2)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Porovnání serializace list odpovědí: response_model vs. responses.ModelJSONResponse.
+
+Bez databáze - pracuje s nepersistovanými ORM objekty se stejnými daty, jaké
+vrací crud.get_credentials. Spouští se z adresáře backend:
+
+    python -m benchmarks.serialization --items 500 --repeat 50
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import database, schemas
+from app.responses import ModelJSONResponse
+
+
+def build_credentials(count: int, blob_bytes: int):
+    now = datetime.now(timezone.utc)
+    categories = [
+        database.PasswordCategory(id=i, user_id=1, name=f"Category {i}", color_hex="#336699", created_at=now, updated_at=now)
+        for i in range(5)
+    ]
+    return [
+        database.Credential(
+            id=i,
+            user_id=1,
+            title=f"Credential {i}",
+            url=f"https://example{i}.com",
+            username=f"user{i}@example.com",
+            encrypted_data=base64.b64encode(os.urandom(blob_bytes)).decode(),
+            encryption_iv=base64.b64encode(os.urandom(12)).decode(),
+            created_at=now,
+            updated_at=now,
+            categories=categories[:i % 3 + 1]
+        )
+        for i in range(count)
+    ]
+
+
+def response_model_path(field, credentials) -> bytes:
+    """Původní cesta: model -> validace response_model -> jsonable dict -> json.dumps"""
+    content = schemas.CredentialListResponse(items=credentials, total=len(credentials))
+    serialized = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(serialized).body
+
+
+def model_json_path(credentials) -> bytes:
+    """Nová cesta: model -> model_dump_json"""
+    content = schemas.CredentialListResponse(items=credentials, total=len(credentials))
+    return ModelJSONResponse(content).body
+
+
+def measure(fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--blob-bytes", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    credentials = build_credentials(args.items, args.blob_bytes)
+    field = create_response_field(name="response", type_=schemas.CredentialListResponse, mode="serialization")
+
+    # Obě cesty musí vracet stejná data
+    assert json.loads(response_model_path(field, credentials)) == json.loads(model_json_path(credentials))
+
+    baseline = measure(lambda: response_model_path(field, credentials), args.repeat)
+    optimized = measure(lambda: model_json_path(credentials), args.repeat)
+    print(json.dumps({
+        "items": args.items,
+        "blob_bytes": args.blob_bytes,
+        "repeat": args.repeat,
+        "response_model": baseline,
+        "model_json_response": optimized,
+        "speedup": round(baseline["mean_ms"] / optimized["mean_ms"], 2)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
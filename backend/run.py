@@ -4,10 +4,9 @@ Startup script for PassOwl backend
 """
 import uvicorn
 import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (stejný modul použije aplikace, .env se načte jednou)
+from app import config  # noqa: F401
 
 if __name__ == "__main__":
     # Get configuration from environment
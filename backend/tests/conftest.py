@@ -0,0 +1,76 @@
+"""Testy běží nad dočasnou SQLite databází, aplikace se importuje až po nastavení prostředí"""
+import itertools
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+_db_dir = tempfile.mkdtemp(prefix="passowl-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["ASYNC_DB_ENABLED"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import database  # noqa: E402
+from app.main import app  # noqa: E402
+
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    database.init_db()
+    return TestClient(app)
+
+
+@pytest.fixture
+def register_user(client):
+    """Zaregistruje a přihlásí nového uživatele (volitelně admina), vrací (hlavičky, id)"""
+    def register(admin: bool = False):
+        username = f"user{next(_usernames)}"
+        response = client.post("/auth/register", json={
+            "username": username,
+            "login_password_hash": "hash",
+            "login_salt": "login-salt",
+            "encryption_salt": "encryption-salt",
+            "public_key": "public-key",
+            "encrypted_private_key": "encrypted-private-key"
+        })
+        assert response.status_code == 200, response.text
+        if admin:
+            # Role se propíše do tokenu až při přihlášení
+            db = database.SessionLocal()
+            try:
+                role = db.query(database.Role).filter(database.Role.name == "admin").first()
+                user = db.query(database.User).filter(database.User.username == username).one()
+                user.roles.append(role or database.Role(name="admin"))
+                db.commit()
+            finally:
+                db.close()
+        response = client.post("/auth/login", json={"username": username, "login_password_hash": "hash"})
+        assert response.status_code == 200, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return headers, client.get("/users/me", headers=headers).json()["id"]
+    return register
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager, který do seznamu zapisuje SQL příkazy poslané do databáze"""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(database.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(database.engine, "before_cursor_execute", before_cursor_execute)
+    return counter
@@ -0,0 +1,50 @@
+"""Write-behind fronta audit logu při výpadku databáze"""
+import time
+
+from app import audit, database
+
+
+class FlakySessionFactory:
+    """Session factory, která selhává, dokud je failing=True"""
+
+    def __init__(self):
+        self.failing = True
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError("database unavailable")
+        return database.SessionLocal()
+
+
+def _wait_for(condition, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def test_failed_flush_backs_off_instead_of_spinning(client):
+    factory = FlakySessionFactory()
+    queue = audit.AuditQueue(session_factory=factory, batch_size=5, flush_interval_ms=50, retry_max_ms=200)
+    try:
+        queue.start()
+        # Fronta drží víc než batch_size záznamů, bez backoffu by vlákno zkoušelo zápis bez čekání
+        for index in range(20):
+            queue.enqueue(audit.build_entry(None, "TEST_BACKOFF", "test", str(index)))
+        time.sleep(0.6)
+
+        # Backoff 50, 100, 200, 200 ms ... => nejvýš několik pokusů za 0,6 s
+        assert 1 <= factory.calls <= 6, factory.calls
+        assert queue.failures == factory.calls
+        assert len(queue) == 20
+
+        factory.failing = False
+        assert _wait_for(lambda: len(queue) == 0, timeout=2), len(queue)
+        assert queue.failures == 0
+    finally:
+        factory.failing = False
+        queue.stop()
@@ -0,0 +1,23 @@
+"""Příliš dlouhý hromadný import odmítne validace požadavku, položky se nevalidují"""
+from app import schemas
+
+
+def _too_long(response, field):
+    assert response.status_code == 422, response.text
+    errors = response.json()["detail"]
+    assert [(error["type"], error["loc"]) for error in errors] == [("too_long", ["body", field])]
+
+
+def test_credential_batch_rejected_during_validation(client, register_user):
+    headers, _ = register_user()
+    # Neplatné položky: chyba je jen jedna, validace seznamu skončí na délce
+    response = client.post("/credentials/batch", headers=headers,
+                           json={"items": [{}] * (schemas.CREDENTIAL_BATCH_MAX_ITEMS + 1)})
+    _too_long(response, "items")
+
+
+def test_bulk_users_rejected_during_validation(client, register_user):
+    headers, _ = register_user(admin=True)
+    response = client.post("/admin/users/bulk", headers=headers,
+                           json={"users": [{}] * (schemas.BULK_USERS_MAX_ITEMS + 1)})
+    _too_long(response, "users")
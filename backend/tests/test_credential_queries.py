@@ -0,0 +1,64 @@
+"""Kategorie hesel se načítají hromadně, počet SQL dotazů nesmí růst s počtem hesel"""
+
+SIZES = (1, 5, 20)
+
+
+def _create_category(client, headers, name):
+    response = client.post("/categories/", headers=headers, json={"name": name, "color_hex": "#000000"})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _create_credential(client, headers, category_ids):
+    response = client.post("/credentials/", headers=headers, json={
+        "title": "title", "username": "login", "encrypted_data": "data", "encryption_iv": "iv",
+        "category_ids": category_ids
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _measure(client, count_queries, headers, params):
+    # První požadavek naplní cache přihlášeného uživatele, měří se až druhý
+    assert client.get("/credentials/", headers=headers, params=params).status_code == 200
+    with count_queries() as statements:
+        response = client.get("/credentials/", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json(), len(statements)
+
+
+def test_credential_list_query_count_is_constant(client, register_user, count_queries):
+    headers, _ = register_user()
+    category_ids = [_create_category(client, headers, f"category{index}") for index in range(3)]
+
+    counts = []
+    created = 0
+    for size in SIZES:
+        while created < size:
+            _create_credential(client, headers, category_ids[:created % 3 + 1])
+            created += 1
+        body, count = _measure(client, count_queries, headers, {"limit": 100})
+        assert len(body["items"]) == size
+        assert sum(len(item["categories"]) for item in body["items"]) == sum(index % 3 + 1 for index in range(size))
+        counts.append(count)
+
+    assert counts == [counts[0]] * len(SIZES), counts
+
+
+def test_credential_list_by_category_query_count_is_constant(client, register_user, count_queries):
+    headers, _ = register_user()
+    category_ids = [_create_category(client, headers, f"category{index}") for index in range(2)]
+
+    counts = []
+    created = 0
+    for size in SIZES:
+        while created < size:
+            _create_credential(client, headers, category_ids)
+            created += 1
+        body, count = _measure(client, count_queries, headers, {"limit": 100, "filter_category": category_ids[0]})
+        assert len(body["items"]) == size
+        # Filtr podle kategorie nesmí zúžit načtené kategorie položky
+        assert all(len(item["categories"]) == 2 for item in body["items"])
+        counts.append(count)
+
+    assert counts == [counts[0]] * len(SIZES), counts
@@ -0,0 +1,17 @@
+"""Import aplikace nesmí sahat na databázi a nad rámec frameworků se musí vejít do rozpočtu"""
+import os
+
+from benchmarks import import_time
+
+# Na pomalém CI stroji lze rozpočet navýšit
+BUDGET = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", import_time.DEFAULT_BUDGET))
+
+
+def test_app_import_time_within_budget():
+    env = import_time.measurement_env()
+    # Nedostupná databáze: pokus o připojení při importu by import shodil
+    env["DATABASE_URL"] = import_time.UNREACHABLE_DATABASE_URL
+
+    timings = import_time.best_of(3, env)
+
+    assert timings["app"] <= BUDGET, timings
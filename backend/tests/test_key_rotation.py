@@ -0,0 +1,21 @@
+"""Rotace klíčů zapisuje přes Core UPDATE, cache přihlášených uživatelů musí zahodit sama"""
+import json
+
+from app import auth, database
+
+
+def test_rotation_invalidates_cached_user(client, register_user):
+    headers, user_id = register_user()
+    username = client.get("/users/me", headers=headers).json()["username"]
+    assert auth.user_cache.get(username) is not None
+
+    body = json.dumps({"type": "keys", "public_key": "new-public-key", "encrypted_private_key": "new-private-key"})
+    response = client.post("/users/keys/rotate", content=body + "\n", headers=headers)
+    assert response.status_code == 200, response.text
+
+    assert auth.user_cache.get(username) is None
+    db = database.SessionLocal()
+    try:
+        assert db.get(database.User, user_id).public_key == "new-public-key"
+    finally:
+        db.close()
@@ -0,0 +1,65 @@
+"""Keyset stránkování musí projít každý řádek právě jednou, i při shodných časech"""
+import pytest
+
+from app import audit, crud, database
+
+PAGE_SIZE = 2
+
+
+def _walk(client, path, headers, params, next_cursor):
+    """Projde všechny stránky a vrátí id v pořadí, v jakém přišla"""
+    ids = []
+    cursor = None
+    for _ in range(50):
+        response = client.get(path, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        ids.extend(item["id"] for item in (body["items"] if isinstance(body, dict) else body))
+        cursor = next_cursor(response)
+        if cursor is None:
+            return ids
+    pytest.fail(f"Pagination did not finish, ids so far: {ids}")
+
+
+@pytest.mark.parametrize("sort_by", [None, "created_at", "title"])
+@pytest.mark.parametrize("sort_direction", [None, "asc", "desc"])
+def test_credential_pages_return_every_row_once(client, register_user, sort_by, sort_direction):
+    headers, _ = register_user()
+    created = []
+    # Stejné názvy i časy (SQLite ukládá CURRENT_TIMESTAMP po sekundách), o pořadí rozhoduje id
+    for index in range(7):
+        response = client.post("/credentials/", headers=headers, json={
+            "title": f"title{index % 2}", "username": "login", "encrypted_data": "data", "encryption_iv": "iv"
+        })
+        assert response.status_code == 200, response.text
+        created.append(response.json()["id"])
+
+    params = {"limit": PAGE_SIZE, "include_total": False}
+    if sort_by:
+        params["sort_by"] = sort_by
+    if sort_direction:
+        params["sort_direction"] = sort_direction
+    ids = _walk(client, "/credentials/", headers, params, lambda response: response.json()["next_cursor"])
+
+    assert sorted(ids) == sorted(created)
+
+
+def test_audit_log_pages_return_every_entry_once(client, register_user):
+    admin_headers, _ = register_user(admin=True)
+    _, user_id = register_user()
+
+    # Střídavě záznamy z write-behind fronty a synchronní zápisy, ve stejné sekundě
+    db = database.SessionLocal()
+    try:
+        for index in range(4):
+            audit.write_entries([audit.build_entry(user_id, "TEST_QUEUED", "test", str(index))])
+            crud.create_audit_log(db, user_id, "TEST_SYNC", "test", str(index))
+        expected = [log_id for (log_id,) in db.query(database.AuditLog.id).filter(database.AuditLog.user_id == user_id)]
+    finally:
+        db.close()
+
+    ids = _walk(client, "/admin/audit-logs", admin_headers, {"limit": PAGE_SIZE, "user_id": user_id},
+                lambda response: response.headers.get("X-Next-Cursor"))
+
+    assert len(ids) == len(set(ids)), ids
+    assert sorted(ids) == sorted(expected)
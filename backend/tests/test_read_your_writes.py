@@ -0,0 +1,78 @@
+"""Read-your-writes s replikami: čtení po zápisu jde z primární databáze i na jiném workeru"""
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app import database, read_your_writes
+
+
+class FakeReplicaSession:
+    def connection(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeReplica:
+    session_factory = FakeReplicaSession
+
+
+class FakeReplicaSet:
+    def candidates(self):
+        return [FakeReplica()]
+
+    def eject(self, replica):
+        pass
+
+
+@pytest.fixture
+def replica_client(monkeypatch):
+    monkeypatch.setattr(database, "read_replicas", FakeReplicaSet())
+    monkeypatch.setattr(database, "_recent_writers", database.TTLCache(max_size=100, ttl_seconds=5))
+
+    app = FastAPI()
+    app.add_middleware(read_your_writes.ReadYourWritesMiddleware)
+
+    @app.post("/items")
+    def write(db=Depends(database.get_db)):
+        return {}
+
+    @app.get("/items")
+    def read(db=Depends(database.get_read_db)):
+        return {"replica": isinstance(db, FakeReplicaSession)}
+
+    return TestClient(app)
+
+
+def test_reads_after_write_use_primary_on_another_worker(replica_client):
+    assert replica_client.get("/items").json() == {"replica": True}
+
+    response = replica_client.post("/items")
+    assert read_your_writes.verified_write_time(response.headers["x-last-write"]) is not None
+    assert read_your_writes.LAST_WRITE_COOKIE in replica_client.cookies
+
+    # Jiný worker o zápisu v paměti neví, rozhoduje cookie
+    database._recent_writers.clear()
+    assert replica_client.get("/items").json() == {"replica": False}
+
+    # Klient bez cookie může vracet hlavičku X-Last-Write
+    replica_client.cookies.clear()
+    headers = {"X-Last-Write": response.headers["x-last-write"]}
+    assert replica_client.get("/items", headers=headers).json() == {"replica": False}
+    assert replica_client.get("/items").json() == {"replica": True}
+
+
+def test_rejects_forged_and_expired_write_times():
+    now = time.time()
+    token = read_your_writes.sign_write_time(now)
+    assert read_your_writes.is_recent_write(read_your_writes.verified_write_time(token), now)
+
+    forged = f"{int((now + 3600) * 1000)}.{token.partition('.')[2]}"
+    assert read_your_writes.verified_write_time(forged) is None
+    assert read_your_writes.verified_write_time("garbage") is None
+
+    expired = read_your_writes.verified_write_time(read_your_writes.sign_write_time(now - 60))
+    assert not read_your_writes.is_recent_write(expired, now)
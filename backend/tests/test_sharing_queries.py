@@ -0,0 +1,77 @@
+"""Počet SQL dotazů list endpointů sdílení nesmí růst s počtem sdílení (N+1)"""
+import itertools
+
+SIZES = (1, 3, 6)
+
+
+def _create_credential(client, headers):
+    response = client.post("/credentials/", headers=headers, json={
+        "title": "shared", "username": "login", "encrypted_data": "data", "encryption_iv": "iv"
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _share(client, headers, credential_id, recipient_id):
+    response = client.post("/api/sharing/share", headers=headers, json={
+        "credential_id": credential_id,
+        "recipient_user_id": recipient_id,
+        "encrypted_sharing_key": "key",
+        "encrypted_shared_data": "data",
+        "sharing_iv": "iv"
+    })
+    assert response.status_code == 200, response.text
+
+
+def _query_counts(client, count_queries, path, headers, add_share):
+    """Počet dotazů endpointu po dosažení každé velikosti z SIZES"""
+    counts = []
+    shared = 0
+    for size in SIZES:
+        while shared < size:
+            add_share()
+            shared += 1
+        # První požadavek naplní cache přihlášeného uživatele, měří se až druhý
+        assert client.get(path, headers=headers).status_code == 200
+        with count_queries() as statements:
+            response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert len(body["items"] if isinstance(body, dict) else body) == size
+        counts.append(len(statements))
+    return counts
+
+
+def test_owned_shares_query_count_is_constant(client, register_user, count_queries):
+    owner_headers, _ = register_user()
+    recipient_ids = itertools.cycle([register_user()[1] for _ in range(3)])
+
+    counts = _query_counts(client, count_queries, "/api/sharing/owned", owner_headers, lambda: _share(
+        client, owner_headers, _create_credential(client, owner_headers), next(recipient_ids)
+    ))
+    assert counts == [counts[0]] * len(SIZES), counts
+
+
+def test_received_shares_query_count_is_constant(client, register_user, count_queries):
+    recipient_headers, recipient_id = register_user()
+    # Hesla od různých vlastníků, aby se při N+1 načítal každý zvlášť
+    owners = itertools.cycle([register_user()[0] for _ in range(3)])
+
+    def add_share():
+        owner_headers = next(owners)
+        _share(client, owner_headers, _create_credential(client, owner_headers), recipient_id)
+
+    counts = _query_counts(client, count_queries, "/api/sharing/received", recipient_headers, add_share)
+    assert counts == [counts[0]] * len(SIZES), counts
+
+
+def test_credential_share_users_query_count_is_constant(client, register_user, count_queries):
+    owner_headers, _ = register_user()
+    credential_id = _create_credential(client, owner_headers)
+    recipient_ids = iter([register_user()[1] for _ in range(max(SIZES))])
+
+    counts = _query_counts(
+        client, count_queries, f"/api/sharing/credential/{credential_id}/users", owner_headers,
+        lambda: _share(client, owner_headers, credential_id, next(recipient_ids))
+    )
+    assert counts == [counts[0]] * len(SIZES), counts
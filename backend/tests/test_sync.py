@@ -0,0 +1,40 @@
+"""Delta sync po smazání starých tombstones"""
+from datetime import datetime, timezone
+
+from app import crud, database
+
+
+def _create_credential(client, headers, title):
+    response = client.post("/credentials/", headers=headers, json={
+        "title": title, "username": "login", "encrypted_data": "data", "encryption_iv": "iv"
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_sync_after_tombstone_purge_requires_full_resync(client, register_user):
+    headers, _ = register_user()
+    kept_id = _create_credential(client, headers, "kept")
+    deleted_id = _create_credential(client, headers, "deleted")
+
+    response = client.get("/sync", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["full_resync"] is True
+    cursor = response.json()["cursor"]
+
+    assert client.delete(f"/credentials/{deleted_id}", headers=headers).status_code == 200
+    delta = client.get("/sync", headers=headers, params={"since": cursor}).json()
+    assert delta["full_resync"] is False
+    assert [item["resource_id"] for item in delta["deleted"]] == [deleted_id]
+
+    db = database.SessionLocal()
+    try:
+        crud.purge_tombstones(db, datetime.now(timezone.utc))
+    finally:
+        db.close()
+
+    # Tombstone je pryč, klient se starým cursorem musí dostat celý trezor
+    resync = client.get("/sync", headers=headers, params={"since": cursor}).json()
+    assert resync["full_resync"] is True
+    assert resync["deleted"] == []
+    assert [item["id"] for item in resync["credentials"]] == [kept_id]
@@ -0,0 +1,29 @@
+"""Vyhledání uživatelů pro sdílení: krátké dotazy hledají jen prefix, delší i podřetězec"""
+
+
+def _register(client, username):
+    response = client.post("/auth/register", json={
+        "username": username,
+        "login_password_hash": "hash",
+        "login_salt": "login-salt",
+        "encryption_salt": "encryption-salt",
+        "public_key": "public-key",
+        "encrypted_private_key": "encrypted-private-key"
+    })
+    assert response.status_code == 200, response.text
+
+
+def _search(client, headers, q):
+    response = client.get("/api/sharing/users/search", params={"q": q}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [user["username"] for user in response.json()]
+
+
+def test_short_queries_match_prefix_only(client, register_user):
+    headers, _ = register_user()
+    for username in ("ZqSearch", "zqsearch2", "xzqsearch"):
+        _register(client, username)
+
+    assert _search(client, headers, "zq") == ["ZqSearch", "zqsearch2"]
+    assert _search(client, headers, "zqs") == ["ZqSearch", "zqsearch2", "xzqsearch"]
+    assert _search(client, headers, "q_") == []
@@ -9,6 +9,9 @@ DROP TABLE IF EXISTS password_categories CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
 DROP TABLE IF EXISTS roles CASCADE;
 DROP TABLE IF EXISTS audit_logs CASCADE;
+DROP TABLE IF EXISTS deleted_items CASCADE;
+DROP TABLE IF EXISTS tombstone_purges CASCADE;
+DROP TABLE IF EXISTS vault_revisions CASCADE;
 
 -- Create roles table
 CREATE TABLE roles (
@@ -81,22 +84,33 @@ CREATE TABLE shared_credentials (
     encrypted_shared_data TEXT NOT NULL, -- data hesla zašifrovaná sharing_key
     sharing_iv VARCHAR(24) NOT NULL, -- IV pro dešifrování shared_data
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     -- Zabránit duplicitnímu sdílení stejného hesla stejnému uživateli
     UNIQUE(credential_id, recipient_user_id)
 );
 
+-- Audit logs are partitioned by month (see create_audit_logs_partition below)
 CREATE TABLE audit_logs
 (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     user_id       integer,
     action        VARCHAR(100) NOT NULL,
     resource_type VARCHAR(50),
     resource_id   VARCHAR(50),
     details       TEXT,
-    created_at    TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    created_at    TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    -- The partition key has to be part of the primary key
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
-CREATE INDEX ix_audit_logs_id ON audit_logs(id);
+-- Catches rows outside of existing monthly partitions, should stay empty
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+
+-- Match the admin audit log filters and keyset pagination on (created_at, id)
+CREATE INDEX idx_audit_logs_created_at_id ON audit_logs(created_at, id);
+CREATE INDEX idx_audit_logs_user_created_at_id ON audit_logs(user_id, created_at, id);
+CREATE INDEX idx_audit_logs_action_created_at_id ON audit_logs(action, created_at, id);
+CREATE INDEX idx_audit_logs_resource_created_at_id ON audit_logs(resource_type, resource_id, created_at, id);
 
 -- Create secure_notes table
 CREATE TABLE secure_notes (
@@ -109,6 +123,28 @@ CREATE TABLE secure_notes (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Tombstones for deleted vault items (used by delta sync)
+CREATE TABLE deleted_items (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    resource_type VARCHAR(50) NOT NULL,
+    resource_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Tombstone cleanups; a sync cursor older than the latest purged_before gets a full resync
+CREATE TABLE tombstone_purges (
+    id SERIAL PRIMARY KEY,
+    purged_before TIMESTAMP WITH TIME ZONE NOT NULL,
+    purged_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Per-user vault revision, bumped on every vault write (ETag / If-None-Match)
+CREATE TABLE vault_revisions (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    revision BIGINT NOT NULL DEFAULT 0
+);
+
 -- Create indexes for better performance
 CREATE INDEX idx_users_username ON users(username);
 CREATE INDEX idx_credentials_user_id ON credentials(user_id);
@@ -118,6 +154,23 @@ CREATE INDEX idx_shared_credentials_owner ON shared_credentials(owner_user_id);
 CREATE INDEX idx_shared_credentials_recipient ON shared_credentials(recipient_user_id);
 CREATE INDEX idx_shared_credentials_credential ON shared_credentials(credential_id);
 
+-- Indexes for delta sync (changes since a cursor)
+CREATE INDEX idx_credentials_user_updated_at ON credentials(user_id, updated_at);
+CREATE INDEX idx_secure_notes_user_updated_at ON secure_notes(user_id, updated_at);
+CREATE INDEX idx_password_categories_user_updated_at ON password_categories(user_id, updated_at);
+CREATE INDEX idx_shared_credentials_recipient_updated_at ON shared_credentials(recipient_user_id, updated_at);
+CREATE INDEX idx_deleted_items_user_deleted_at ON deleted_items(user_id, deleted_at);
+
+-- Trigram index for substring user search (ILIKE '%q%') when sharing
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_users_username_trgm ON users USING gin (username gin_trgm_ops);
+-- Prefix search for queries shorter than 3 characters (no trigrams): lower(username) LIKE 'q%'
+CREATE INDEX idx_users_username_lower_prefix ON users (lower(username) text_pattern_ops);
+
+-- Indexes for keyset pagination on (sort column, id)
+CREATE INDEX idx_credentials_user_title_id ON credentials(user_id, title, id);
+CREATE INDEX idx_credentials_user_updated_at_id ON credentials(user_id, updated_at, id);
+
 -- Insert default roles
 INSERT INTO roles (name, description) VALUES 
     ('user', 'Standard user role'),
@@ -138,6 +191,7 @@ CREATE TRIGGER update_roles_updated_at BEFORE UPDATE ON roles FOR EACH ROW EXECU
 CREATE TRIGGER update_password_categories_updated_at BEFORE UPDATE ON password_categories FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_credentials_updated_at BEFORE UPDATE ON credentials FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_secure_notes_updated_at BEFORE UPDATE ON secure_notes FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_shared_credentials_updated_at BEFORE UPDATE ON shared_credentials FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 
 -- View for user statistics
@@ -156,8 +210,58 @@ ORDER BY
     u.username;
 
 
+-- Create a monthly audit_logs partition for the month containing month_start
+-- Upcoming partitions are created and expired ones archived by `python -m app.audit_retention`
+-- Rows of that month already in audit_logs_default (the job ran late) are moved
+-- into a standalone table first, which is then attached; CREATE ... PARTITION OF
+-- would fail on them. The function runs in a single transaction.
+CREATE OR REPLACE FUNCTION create_audit_logs_partition(month_start DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    partition_start DATE := date_trunc('month', month_start)::DATE;
+    partition_name TEXT := 'audit_logs_' || to_char(partition_start, 'YYYY_MM');
+    range_start TIMESTAMP WITH TIME ZONE := partition_start::TIMESTAMP AT TIME ZONE 'UTC';
+    range_end TIMESTAMP WITH TIME ZONE := (partition_start + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+BEGIN
+    IF to_regclass(quote_ident(partition_name)) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    -- Blocks inserts into the default partition until the new partition is attached
+    LOCK TABLE audit_logs_default IN EXCLUSIVE MODE;
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        partition_name
+    );
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM audit_logs_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        range_start, range_end, partition_name
+    );
+    -- The CHECK constraint lets ATTACH skip validating the moved rows
+    EXECUTE format(
+        'ALTER TABLE %I ADD CONSTRAINT %I CHECK (created_at >= %L AND created_at < %L)',
+        partition_name, partition_name || '_range', range_start, range_end
+    );
+    EXECUTE format(
+        'ALTER TABLE audit_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+    EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', partition_name, partition_name || '_range');
+    RETURN partition_name;
+END;
+$$;
+
+-- Partitions for the current and next two months
+SELECT create_audit_logs_partition((date_trunc('month', NOW()) + n * INTERVAL '1 month')::DATE)
+FROM generate_series(0, 2) AS n;
+
+
 -- Create a procedure to clean up old audit logs
--- Should be run periodically via a pgcron job or similar scheduler (for simplicity not implemented rn)
+-- Row-by-row delete, prefer dropping whole partitions via app.audit_retention
 CREATE OR REPLACE PROCEDURE cleanup_audit_logs(older_than_days INT)
 LANGUAGE plpgsql
 AS $$
@@ -170,6 +274,24 @@ END;
 $$;
 
 
+-- Create a procedure to clean up old sync tombstones
+-- The cutoff is recorded in tombstone_purges; /sync answers clients with an
+-- older cursor with a full resync (full_resync: true) instead of a delta
+CREATE OR REPLACE PROCEDURE cleanup_deleted_items(older_than_days INT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    cutoff TIMESTAMP WITH TIME ZONE := NOW() - (older_than_days || ' days')::INTERVAL;
+BEGIN
+    INSERT INTO tombstone_purges (purged_before) VALUES (cutoff);
+    DELETE FROM deleted_items
+    WHERE deleted_at < cutoff;
+
+    RAISE NOTICE 'Deleted sync tombstones older than % days.', older_than_days;
+END;
+$$;
+
+
 -- stats_user
 CREATE ROLE stats_user LOGIN PASSWORD ''; -- Should be set to password
 GRANT CONNECT ON DATABASE neondb TO stats_user;